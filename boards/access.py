@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from .models import Board, MembershipVersion
+
+
+def member_cache_key(user_id, version):
+    return f'board-access:{user_id}:{version}'
+
+
+def member_board_ids(user):
+    """Ids of the boards the user is a member of, cached across requests.
+
+    The set is cached under the user's MembershipVersion, which the
+    membership and board-deletion signals bump (see signals.py). Reading
+    the version is one primary-key lookup, and since it lives in the
+    database every worker process stops using a stale set at once.
+    """
+    key = member_cache_key(user.pk, MembershipVersion.current(user.pk))
+    board_ids = cache.get(key)
+    if board_ids is None:
+        memberships = Board.members.through.objects.filter(board=OuterRef('pk'), user=user)
+        board_ids = frozenset(Board.objects.filter(Exists(memberships)).values_list('pk', flat=True))
+        cache.set(key, board_ids, getattr(settings, 'BOARD_ACCESS_CACHE_TIMEOUT', 60 * 60))
+    return board_ids
+
+
+def invalidate_member_boards(user_ids):
+    """Retire the cached membership sets of the given users"""
+    MembershipVersion.bump(user_ids)
+
+
+def has_board_access(request, board):
+    """True if the current user owns the board or is one of its members.
+
+    Ownership is read from the board row itself, so only membership goes
+    through the cache. Answers are memoized on the request, so AJAX views
+    and templates can ask repeatedly for free.
+    """
+    user = request.user
+    if board.owner_id == user.id:
+        return True
+    memo = request.__dict__.setdefault('_board_access', {})
+    if board.pk not in memo:
+        memo[board.pk] = board.pk in member_board_ids(user)
+    return memo[board.pk]
@@ -1,10 +1,13 @@
 from django.contrib import admin
-from .models import Board, TaskList, Task, TaskComment
+from .pagination import CURSOR_VAR, ChangeListPaginator
+from .models import (
+    Board, BoardTemplate, TaskList, Task, TaskComment, Label, OutgoingEmail, NotificationPreference, DigestItem, ExportJob,
+)
 
 
 @admin.register(Board)
 class BoardAdmin(admin.ModelAdmin):
-    list_display = ('name', 'owner', 'created_at', 'updated_at')
+    list_display = ('name', 'owner', 'task_count', 'created_at', 'updated_at')
     list_filter = ('created_at', 'updated_at')
     search_fields = ('name', 'description', 'owner__username')
     filter_horizontal = ('members',)
@@ -24,9 +27,15 @@ class BoardAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(BoardTemplate)
+class BoardTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name', 'description')
+
+
 @admin.register(TaskList)
 class TaskListAdmin(admin.ModelAdmin):
-    list_display = ('name', 'board', 'position', 'created_at')
+    list_display = ('name', 'board', 'position', 'task_count', 'created_at')
     list_filter = ('board', 'created_at')
     search_fields = ('name', 'board__name')
     ordering = ('board', 'position')
@@ -38,6 +47,22 @@ class TaskAdmin(admin.ModelAdmin):
     list_filter = ('priority', 'completed', 'due_date', 'created_at', 'task_list__board')
     search_fields = ('title', 'description', 'labels')
     readonly_fields = ('created_at', 'updated_at')
+    # Pages are walked by cursor on (sort column, id), newest first by
+    # default (task_created_idx)
+    ordering = ('-created_at',)
+    paginator = ChangeListPaginator
+    show_full_result_count = False
+
+    def changelist_view(self, request, extra_context=None):
+        # The changelist rejects unknown parameters as bad filters, so the
+        # cursor is taken out of the query string before it looks
+        request.GET = request.GET.copy()
+        request.changelist_cursor = request.GET.pop(CURSOR_VAR, [None])[-1]
+        return super().changelist_view(request, extra_context)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(queryset, per_page, cursor=getattr(request, 'changelist_cursor', None),
+                              orphans=orphans, allow_empty_first_page=allow_empty_first_page)
     
     fieldsets = (
         (None, {
@@ -56,9 +81,46 @@ class TaskAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(Label)
+class LabelAdmin(admin.ModelAdmin):
+    list_display = ('name', 'board')
+    list_filter = ('board',)
+    search_fields = ('name', 'board__name')
+
+
 @admin.register(TaskComment)
 class TaskCommentAdmin(admin.ModelAdmin):
     list_display = ('task', 'author', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('content', 'task__title', 'author__username')
     readonly_fields = ('created_at',)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'created_at', 'attempts', 'sent_at')
+    list_filter = ('sent_at', 'created_at')
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'delivery')
+    list_filter = ('delivery',)
+    search_fields = ('user__username',)
+
+
+@admin.register(DigestItem)
+class DigestItemAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'task', 'reassigned', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('recipient__username', 'task__title')
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'status', 'boards_done', 'boards_total', 'size', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'heartbeat_at', 'attempts', 'file', 'size', 'error')
@@ -0,0 +1,394 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from . import export_worker
+from .models import Board, TaskList, Task, TaskComment, TaskLabel, ExportJob, split_labels
+
+
+# Rows fetched per database round trip and rows written per streamed chunk
+EXPORT_CHUNK_SIZE = 500
+CSV_ROWS_PER_CHUNK = 500
+# Bytes of JSON gathered before a chunk is handed to the response
+JSON_CHUNK_BYTES = 64 * 1024
+
+CSV_HEADER = [
+    'Lista', 'Tarea', 'Descripción', 'Fecha límite',
+    'Prioridad', 'Asignado a', 'Etiquetas', 'Completada'
+]
+
+
+def board_task_rows(board, *fields, updated_since=None):
+    """Iterate over the board's tasks as value tuples, in board order.
+
+    One joined query ordered like the board page (list position, then task
+    position), read in chunks so memory does not grow with the board.
+    """
+    tasks = Task.objects.filter(task_list__board=board)
+    if updated_since is not None:
+        tasks = tasks.filter(updated_at__gt=updated_since)
+    return tasks.order_by(
+        'task_list__position', 'task_list_id', 'position', 'id'
+    ).values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_board_csv(board):
+    """Yield the board's CSV export a few hundred rows at a time"""
+    priority_display = dict(Task.PRIORITY_CHOICES)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    rows = board_task_rows(
+        board, 'task_list__name', 'title', 'description', 'due_date', 'priority',
+        'assigned_to_id', 'assigned_to__first_name', 'assigned_to__last_name', 'labels', 'completed',
+    )
+    for count, (list_name, title, description, due_date, priority, assigned_to_id, first_name, last_name,
+                labels, completed) in enumerate(rows, 1):
+        writer.writerow([
+            list_name,
+            title,
+            description,
+            due_date.strftime('%Y-%m-%d') if due_date else '',
+            priority_display.get(priority, priority),
+            # Same as User.get_full_name()
+            f'{first_name} {last_name}'.strip() if assigned_to_id else '',
+            labels,
+            'Sí' if completed else 'No'
+        ])
+        if count % CSV_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _nested(value, depth):
+    """json.dumps(value, indent=2) as it appears ``depth`` levels deep"""
+    return json.dumps(value, indent=2).replace('\n', '\n' + '  ' * depth)
+
+
+def _load_labels(task_ids):
+    """Map task id -> label names, in one query over the label join table"""
+    labels = {}
+    task_labels = TaskLabel.objects.filter(task_id__in=task_ids).order_by('task_id', 'position')
+    for task_id, name in task_labels.values_list('task_id', 'label__name'):
+        labels.setdefault(task_id, []).append(name)
+    return labels
+
+
+def _export_tasks(board, include_comments):
+    """Yield (task_list_id, task dict) for the board, loading a chunk at a time.
+
+    Labels and, optionally, comments are fetched with one query per chunk
+    of tasks, so only one chunk is ever held in memory.
+    """
+    priority_display = dict(Task.PRIORITY_CHOICES)
+    rows = board_task_rows(
+        board, 'id', 'task_list_id', 'title', 'description', 'due_date', 'priority', 'labels',
+        'assigned_to_id', 'assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name',
+        'completed', 'created_at',
+    )
+    for batch in _batches(rows, EXPORT_CHUNK_SIZE):
+        task_ids = [row[0] for row in batch]
+        labels = _load_labels(task_ids)
+        comments = {}
+        if include_comments:
+            task_comments = TaskComment.objects.filter(task_id__in=task_ids).order_by('task_id', 'created_at', 'id')
+            for task_id, username, first_name, last_name, content, created_at in task_comments.values_list(
+                'task_id', 'author__username', 'author__first_name', 'author__last_name', 'content', 'created_at'
+            ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                comments.setdefault(task_id, []).append({
+                    'author': f'{first_name} {last_name}'.strip() or username,
+                    'author_username': username,
+                    'content': content,
+                    'created_at': created_at.isoformat(),
+                })
+
+        for (task_id, task_list_id, title, description, due_date, priority, label_text, assigned_to_id,
+             username, first_name, last_name, completed, created_at) in batch:
+            task = {
+                'title': title,
+                'description': description,
+                'due_date': due_date.isoformat() if due_date else None,
+                'priority': priority_display.get(priority, priority),
+                # Rows written in bulk without the label sync fall back to the text field
+                'labels': labels[task_id] if task_id in labels else split_labels(label_text),
+                # Same as User.get_full_name()
+                'assigned_to': f'{first_name} {last_name}'.strip() if assigned_to_id else None,
+                # Lets imports match the assignee exactly
+                'assigned_to_username': username,
+                'completed': completed,
+                'created_at': created_at.isoformat(),
+            }
+            if include_comments:
+                task['comments'] = comments.get(task_id, [])
+            yield task_list_id, task
+
+
+def _board_json_pieces(board, include_comments):
+    board_data = {
+        'name': board.name,
+        'description': board.description,
+        'created_at': board.created_at.isoformat(),
+    }
+    yield '{\n  "board": ' + _nested(board_data, 1) + ',\n  "lists": ['
+
+    lists = list(TaskList.objects.filter(board=board).order_by('position', 'id').values_list(
+        'id', 'name', 'position'
+    ))
+    list_order = {list_id: index for index, (list_id, _, _) in enumerate(lists)}
+    tasks = _export_tasks(board, include_comments)
+    pending = next(tasks, None)
+    for list_index, (list_id, name, position) in enumerate(lists):
+        yield (',' if list_index else '') + '\n    {'
+        yield f'\n      "name": {json.dumps(name)},\n      "position": {json.dumps(position)},\n      "tasks": ['
+        # Tasks come in the same list order, so each list takes a run of
+        # them; skip any whose list changed between the two queries
+        while pending is not None and list_order.get(pending[0], -1) < list_index:
+            pending = next(tasks, None)
+        count = 0
+        while pending is not None and pending[0] == list_id:
+            yield (',' if count else '') + '\n        ' + _nested(pending[1], 4)
+            count += 1
+            pending = next(tasks, None)
+        yield ('\n      ]' if count else ']') + '\n    }'
+    yield ('\n  ]' if lists else ']') + '\n}'
+
+
+def stream_board_json(board, include_comments=False):
+    """Yield the board's JSON export in chunks of about JSON_CHUNK_BYTES.
+
+    The document is the one json.dumps(..., indent=2) would produce for the
+    whole board, written piece by piece as the tasks are read.
+    """
+    buffer, size = [], 0
+    for piece in _board_json_pieces(board, include_comments):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= JSON_CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
+
+
+def stream_board_ndjson(board, updated_since=None):
+    """Yield the board's tasks as gzip-compressed newline-delimited JSON.
+
+    One compact record per task with its list and board copied onto it, so
+    consumers can load lines straight into a table. With ``updated_since``
+    only tasks changed after that moment are written.
+    """
+    priority_display = dict(Task.PRIORITY_CHOICES)
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    rows = board_task_rows(
+        board, 'id', 'task_list_id', 'task_list__name', 'task_list__position', 'position', 'title',
+        'description', 'due_date', 'priority', 'labels', 'assigned_to_id', 'assigned_to__username',
+        'assigned_to__first_name', 'assigned_to__last_name', 'completed', 'comment_count', 'created_at',
+        'updated_at', updated_since=updated_since,
+    )
+    for batch in _batches(rows, EXPORT_CHUNK_SIZE):
+        labels = _load_labels([row[0] for row in batch])
+        lines = []
+        for (task_id, list_id, list_name, list_position, position, title, description, due_date, priority,
+             label_text, assigned_to_id, username, first_name, last_name, completed, comment_count,
+             created_at, updated_at) in batch:
+            lines.append(json.dumps({
+                'board_id': board.pk,
+                'board': board.name,
+                'list_id': list_id,
+                'list': list_name,
+                'list_position': list_position,
+                'task_id': task_id,
+                'position': position,
+                'title': title,
+                'description': description,
+                'due_date': due_date.isoformat() if due_date else None,
+                'priority': priority,
+                'priority_display': priority_display.get(priority, priority),
+                'labels': labels[task_id] if task_id in labels else split_labels(label_text),
+                'assigned_to_id': assigned_to_id,
+                'assigned_to': username,
+                'assigned_to_name': f'{first_name} {last_name}'.strip() if assigned_to_id else None,
+                'completed': completed,
+                'comment_count': comment_count,
+                'created_at': created_at.isoformat(),
+                'updated_at': updated_at.isoformat(),
+            }, ensure_ascii=False, separators=(',', ':')))
+        lines.append('')
+        chunk = compressor.compress('\n'.join(lines).encode('utf-8'))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def write_board_export(board_id, directory, include_comments=False, heartbeat=None):
+    """Write one board's JSON export into ``directory``.
+
+    Runs in an export pool process (see export_worker.py). Returns
+    (board_id, path), with a None path if the board was deleted after the
+    job listed it. ``heartbeat``, if given, is called after every chunk.
+    """
+    board = Board.objects.filter(pk=board_id).first()
+    if board is None:
+        return board_id, None
+    path = os.path.join(directory, f'{board_id}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in stream_board_json(board, include_comments):
+            f.write(chunk)
+            if heartbeat is not None:
+                heartbeat()
+    return board_id, path
+
+
+def _heartbeat_interval():
+    # Several heartbeats per lease, so one slow write does not lose it
+    return getattr(settings, 'EXPORT_LEASE', 600) / 4
+
+
+def _board_exports(board_ids, directory, include_comments, heartbeat):
+    """Yield (board_id, path) as each board is written, on a process pool.
+
+    EXPORT_WORKERS processes serialize boards in parallel; with one worker
+    (or one board) they are written here, one after another. ``heartbeat``
+    is called while a board is being written, however long it takes.
+    """
+    workers = getattr(settings, 'EXPORT_WORKERS', os.cpu_count() or 1)
+    if workers <= 1 or len(board_ids) <= 1:
+        for board_id in board_ids:
+            yield write_board_export(board_id, directory, include_comments, heartbeat)
+        return
+    # Spawned rather than forked, so no process inherits this one's connections
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(board_ids)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=export_worker.init_worker,
+    ) as executor:
+        pending = {executor.submit(export_worker.write_board, board_id, directory, include_comments)
+                   for board_id in board_ids}
+        while pending:
+            done, pending = wait(pending, timeout=_heartbeat_interval(), return_when=FIRST_COMPLETED)
+            heartbeat()
+            for future in done:
+                yield future.result()
+
+
+def export_archive_path(job):
+    """Path of the job's archive relative to MEDIA_ROOT"""
+    return os.path.join('exports', str(job.user_id), f'export-{job.pk}.zip')
+
+
+class ExportJobLost(Exception):
+    """The job was claimed again by another worker after its lease ran out"""
+
+
+def _update_job(job, **fields):
+    """Save fields of a running job and renew its lease.
+
+    Updates only apply while the job still belongs to this run (same
+    started_at), so a worker that lost its lease cannot overwrite the run
+    that replaced it.
+    """
+    updated = ExportJob.objects.filter(pk=job.pk, status=ExportJob.RUNNING, started_at=job.started_at).update(
+        heartbeat_at=timezone.now(), **fields
+    )
+    if not updated:
+        raise ExportJobLost(job.pk)
+
+
+def _lease_renewer(job):
+    """Return a callable renewing the job's lease, at most once per heartbeat interval"""
+    renewed_at = time.monotonic()
+
+    def renew():
+        nonlocal renewed_at
+        if time.monotonic() - renewed_at >= _heartbeat_interval():
+            _update_job(job)
+            renewed_at = time.monotonic()
+    return renew
+
+
+def run_export_job(job):
+    """Write a zip with the JSON export of every board the job's user can access.
+
+    Progress is saved after each board so the status endpoint can report it,
+    and the lease is renewed while boards are written, so a board that takes
+    longer than EXPORT_LEASE is not claimed by another worker.
+    The archive is built under a temporary name and only moved into place
+    once complete, so a download never sees a partial file.
+    """
+    boards = dict(Board.objects.visible_to(job.user).order_by('pk').values_list('pk', 'name'))
+    _update_job(job, boards_total=len(boards))
+
+    relative = export_archive_path(job)
+    path = os.path.join(settings.MEDIA_ROOT, relative)
+    # One temporary file per run, in case a run that lost its lease is still going
+    part = f'{path}.{job.attempts}.part'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with tempfile.TemporaryDirectory() as directory, \
+                zipfile.ZipFile(part, 'w', zipfile.ZIP_DEFLATED) as archive:
+            exports = _board_exports(list(boards), directory, job.include_comments, _lease_renewer(job))
+            for done, (board_id, board_path) in enumerate(exports, 1):
+                if board_path is not None:
+                    archive.write(board_path, f'{board_id}-{slugify(boards[board_id]) or "tablero"}.json')
+                    os.remove(board_path)
+                _update_job(job, boards_done=done)
+        os.replace(part, path)
+    except ExportJobLost:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    except Exception as e:
+        if os.path.exists(part):
+            os.remove(part)
+        _update_job(job, status=ExportJob.FAILED, error=str(e), finished_at=timezone.now())
+        raise
+    _update_job(job, status=ExportJob.DONE, file=relative, size=os.path.getsize(path), finished_at=timezone.now())
+
+
+def claim_export_job():
+    """Mark the oldest queued job as running and return it, or None.
+
+    A running job whose heartbeat is older than EXPORT_LEASE lost its
+    worker (killed, out of memory, redeployed) and is claimed again, up to
+    EXPORT_MAX_ATTEMPTS runs in all; after that it is marked failed so the
+    user can ask for a new one.
+    """
+    now = timezone.now()
+    stale = Q(status=ExportJob.RUNNING,
+              heartbeat_at__lt=now - timedelta(seconds=getattr(settings, 'EXPORT_LEASE', 600)))
+    with transaction.atomic():
+        ExportJob.objects.filter(stale, attempts__gte=getattr(settings, 'EXPORT_MAX_ATTEMPTS', 3)).update(
+            status=ExportJob.FAILED, error='La exportación se interrumpió demasiadas veces', finished_at=now
+        )
+        job = ExportJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=ExportJob.PENDING) | stale
+        ).order_by('created_at', 'id').first()
+        if job is not None:
+            job.status = ExportJob.RUNNING
+            job.started_at = job.heartbeat_at = now
+            job.attempts += 1
+            job.boards_done = 0
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts', 'boards_done'])
+    return job
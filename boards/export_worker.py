@@ -0,0 +1,16 @@
+"""Entry points of the export process pool.
+
+Spawned processes unpickle these functions before Django is set up, so
+this module must not import models at import time.
+"""
+import django
+
+
+def init_worker():
+    """Set up Django in a freshly spawned export process"""
+    django.setup()
+
+
+def write_board(board_id, directory, include_comments):
+    from .export import write_board_export
+    return write_board_export(board_id, directory, include_comments)
@@ -4,7 +4,7 @@ from django.contrib.auth.models import User
 from django.db import models
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Field
-from .models import Board, TaskList, Task, TaskComment
+from .models import Board, BoardTemplate, TaskList, Task, TaskComment, NotificationPreference
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -43,6 +43,12 @@ class CustomUserCreationForm(UserCreationForm):
 
 
 class BoardForm(forms.ModelForm):
+    template = forms.ModelChoiceField(
+        queryset=BoardTemplate.objects.all(), required=False, label='Plantilla',
+        empty_label='Listas por defecto (Por hacer, En progreso, Terminado)'
+    )
+    field_order = ['name', 'description', 'template', 'members']
+
     class Meta:
         model = Board
         fields = ['name', 'description', 'members']
@@ -59,10 +65,16 @@ class BoardForm(forms.ModelForm):
             # Exclude the current user from members selection
             self.fields['members'].queryset = User.objects.exclude(id=user.id)
         
+        # Templates only apply when the board is created
+        fields = ['name', 'description']
+        if self.instance.pk:
+            del self.fields['template']
+        else:
+            fields.append('template')
+        
         self.helper = FormHelper()
         self.helper.layout = Layout(
-            'name',
-            'description',
+            *fields,
             Field('members', css_class='form-check'),
             Submit('submit', 'Guardar Tablero', css_class='btn btn-primary')
         )
@@ -157,6 +169,29 @@ class TaskCommentForm(forms.ModelForm):
         )
 
 
+class NotificationPreferenceForm(forms.ModelForm):
+    class Meta:
+        model = NotificationPreference
+        fields = ['delivery']
+        widgets = {
+            'delivery': forms.RadioSelect
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.layout = Layout(
+            'delivery',
+            Submit('submit', 'Guardar Preferencias', css_class='btn btn-primary')
+        )
+
+
+class BoardImportForm(forms.Form):
+    file = forms.FileField(label='Archivo JSON', help_text='Un archivo generado con "Exportar JSON"')
+    name = forms.CharField(max_length=100, required=False, label='Nombre',
+                           help_text='Déjalo vacío para usar el nombre del archivo')
+
+
 class TaskMoveForm(forms.Form):
     new_list = forms.ModelChoiceField(queryset=TaskList.objects.none())
     new_position = forms.IntegerField(min_value=0, required=False)
@@ -0,0 +1,336 @@
+import codecs
+import json
+import re
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Trim
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Board, TaskList, Task, TaskComment, bulk_tasks_created, rebuild_counters, sync_task_labels
+
+
+# Bytes read from the source per refill and tasks inserted per bulk_create()
+IMPORT_READ_SIZE = 256 * 1024
+IMPORT_CHUNK_SIZE = 2000
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class BoardImportError(ValueError):
+    """The document is not a board in the export_board_json format"""
+
+
+class JsonStream:
+    """Pull parser over a JSON document read from a file a chunk at a time.
+
+    Scalars and small containers are decoded whole with raw_decode();
+    objects and arrays the caller walks with object_items() and
+    array_items() are read element by element, so only the element being
+    decoded (plus one read chunk) is ever held in memory.
+    """
+
+    def __init__(self, source, read_size=IMPORT_READ_SIZE):
+        self.source = source
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Append the next chunk of the source to the buffer; False at the end"""
+        if self.eof:
+            return False
+        data = self.source.read(self.read_size)
+        if not data:
+            self.eof = True
+        text = data if isinstance(data, str) else self.decoder.decode(data, final=not data)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return bool(data)
+
+    def _peek(self):
+        """Return the next non-blank character without consuming it ('' at the end)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, *chars):
+        char = self._peek()
+        if char not in chars:
+            raise BoardImportError(f'JSON inválido: se esperaba {" o ".join(chars)}')
+        self.pos += 1
+        return char
+
+    def at_end(self):
+        """True once only blanks are left"""
+        return self._peek() == ''
+
+    def value(self):
+        """Decode and return the next value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise BoardImportError('JSON inválido o incompleto')
+            # A number cut by the end of the buffer ("1." of "1.5") decodes
+            # too; only trust it once a character that cannot extend it follows
+            if (end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def object_items(self):
+        """Walk an object, yielding each key with the stream left on its value.
+
+        The caller must consume the value (with value(), object_items() or
+        array_items()) before asking for the next key.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise BoardImportError('JSON inválido: se esperaba una clave')
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._expect(',', '}') == '}':
+                return
+
+    def array_items(self):
+        """Walk an array, yielding once per element with the stream left on it"""
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self._expect(',', ']') == ']':
+                return
+
+
+def board_collaborators(user):
+    """The user and everyone who owns or is a member of a board they share"""
+    shared = Board.objects.filter(Q(owner=user) | Q(members=user)).values('pk')
+    return User.objects.filter(
+        Q(pk=user.pk)
+        | Q(pk__in=Board.objects.filter(pk__in=shared).values('owner'))
+        | Q(pk__in=Board.members.through.objects.filter(board__in=shared).values('user'))
+    )
+
+
+def parse_created_at(value, what):
+    """The exported creation time, or None if the file has none"""
+    if not value:
+        return None
+    try:
+        created_at = parse_datetime(value)
+    except (TypeError, ValueError):
+        created_at = None
+    if created_at is None:
+        raise BoardImportError(f'Fecha de creación inválida en {what}')
+    if settings.USE_TZ and timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return created_at
+
+
+class BoardImporter:
+    """Insert a board read from an export document, a chunk of tasks at a time.
+
+    Everything goes through bulk_create(), so no per-row save() or signal
+    handler runs; labels are synced and counters rebuilt in set-based
+    queries instead. bulk_create() stamps created_at with the current
+    time, so the exported ones are written back with one bulk_update().
+    """
+    priorities = {key: key for key, _ in Task.PRIORITY_CHOICES}
+    priorities.update({label: key for key, label in Task.PRIORITY_CHOICES})
+
+    def __init__(self, owner, name=None, users=None):
+        self.owner = owner
+        self.name = name
+        # Users the names in the file may resolve to
+        self.candidates = board_collaborators(owner) if users is None else users
+        self.board = None
+        self.list_count = 0
+        self.task_count = 0
+        # Tasks read so far per list, which gives each its position
+        self.list_sizes = {}
+        self.pending = []
+        self.users = {}
+        self.assignees = set()
+
+    def start_board(self, data):
+        if not isinstance(data, dict):
+            raise BoardImportError('"board" debe ser un objeto')
+        if self.board is not None:
+            raise BoardImportError('"board" debe ir antes que "lists"')
+        board = Board(
+            owner=self.owner,
+            name=self.name or data.get('name') or 'Tablero importado',
+            description=data.get('description') or '',
+        )
+        # bulk_create() skips the post_save handler that adds the default lists
+        Board.objects.bulk_create([board])
+        self.board = board
+
+    def add_list(self, name):
+        if self.board is None:
+            self.start_board({})
+        if not isinstance(name, str) or not name.strip():
+            raise BoardImportError(f'La lista {self.list_count + 1} no tiene nombre')
+        task_list = TaskList(board=self.board, name=name, position=self.list_count)
+        TaskList.objects.bulk_create([task_list])
+        self.list_sizes[task_list.pk] = 0
+        self.list_count += 1
+        return task_list
+
+    def user_id(self, name):
+        """Id of the candidate user with this username (or, failing that, unique full name)"""
+        if not name:
+            return None
+        if name not in self.users:
+            user_id = self.candidates.filter(username=name).values_list('pk', flat=True).first()
+            if user_id is None:
+                full_name = Trim(Concat('first_name', Value(' '), 'last_name'))
+                matches = list(self.candidates.annotate(full_name=full_name).filter(
+                    full_name=name
+                ).values_list('pk', flat=True)[:2])
+                user_id = matches[0] if len(matches) == 1 else None
+            self.users[name] = user_id
+        return self.users[name]
+
+    def add_task(self, task_list, data):
+        if not isinstance(data, dict) or not isinstance(data.get('title'), str) or not data['title'].strip():
+            raise BoardImportError(f'Hay una tarea sin título en la lista "{task_list.name}"')
+        labels = data.get('labels') or ''
+        if isinstance(labels, list):
+            labels = ', '.join(str(label) for label in labels)
+        due_date = None
+        if data.get('due_date'):
+            try:
+                due_date = parse_date(data['due_date'])
+            except (TypeError, ValueError):
+                pass
+            if due_date is None:
+                raise BoardImportError(f'Fecha límite inválida en la tarea "{data["title"]}"')
+        created_at = parse_created_at(data.get('created_at'), f'la tarea "{data["title"]}"')
+        assigned_to_id = self.user_id(data.get('assigned_to_username') or data.get('assigned_to'))
+        if assigned_to_id is not None and assigned_to_id != self.owner.pk:
+            self.assignees.add(assigned_to_id)
+        self.list_sizes[task_list.pk] += 1
+        task = Task(
+            task_list=task_list,
+            title=data['title'][:200],
+            description=data.get('description') or '',
+            due_date=due_date,
+            priority=self.priorities.get(data.get('priority'), 'M'),
+            labels=labels[:200],
+            assigned_to_id=assigned_to_id,
+            completed=bool(data.get('completed')),
+            position=self.list_sizes[task_list.pk] * Task.POSITION_GAP,
+        )
+        task.created_at = created_at
+        self.pending.append((task, data.get('comments') or []))
+        if len(self.pending) >= IMPORT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered tasks, their labels and their comments"""
+        if not self.pending:
+            return
+        tasks = [task for task, _ in self.pending]
+        comments = []
+        for task, task_comments in self.pending:
+            for data in task_comments:
+                if isinstance(data, dict):
+                    comment = TaskComment(
+                        task=task, content=data.get('content') or '',
+                        author_id=self.user_id(data.get('author_username') or data.get('author')) or self.owner.pk,
+                    )
+                    comment.created_at = parse_created_at(data.get('created_at'), f'un comentario de "{task.title}"')
+                    comments.append(comment)
+        self._bulk_create(Task, tasks)
+        sync_task_labels(tasks)
+        bulk_tasks_created.send(sender=Task, tasks=tasks)
+        self._bulk_create(TaskComment, comments)
+        self.task_count += len(tasks)
+        self.pending = []
+
+    def _bulk_create(self, model, objs):
+        """bulk_create() the rows, keeping the created_at they were given"""
+        created = [(obj, obj.created_at) for obj in objs]
+        model.objects.bulk_create(objs)
+        kept = []
+        for obj, created_at in created:
+            if created_at is not None:
+                obj.created_at = created_at
+                kept.append(obj)
+        if kept:
+            model.objects.bulk_update(kept, ['created_at'])
+
+    def finish(self):
+        if self.board is None:
+            self.start_board({})
+        self.flush()
+        # Tasks are only ever assigned to the owner or members of their board
+        if self.assignees:
+            self.board.members.add(*self.assignees)
+        rebuild_counters(Board.objects.filter(pk=self.board.pk))
+        self.board.refresh_from_db()
+        return self.board
+
+
+def read_list(stream, importer):
+    spec = {}
+    task_list = None
+    for key in stream.object_items():
+        if key == 'tasks':
+            task_list = importer.add_list(spec.get('name'))
+            for _ in stream.array_items():
+                importer.add_task(task_list, stream.value())
+        else:
+            spec[key] = stream.value()
+    if task_list is None:
+        importer.add_list(spec.get('name'))
+
+
+def import_board(source, owner, name=None, users=None):
+    """Create a board for ``owner`` from a file in the export_board_json format.
+
+    ``source`` is any object with read() (an open file, an upload). The
+    document is parsed incrementally and written in one transaction, so a
+    malformed file leaves nothing behind. Assignees and comment authors are
+    matched by username (by full name in files without usernames) among
+    ``users``, by default the owner and the people they already share a
+    board with, so an upload cannot write comments as, or assign tasks to,
+    anyone else. Unknown assignees are left empty and unknown authors
+    become the owner; matched assignees become members of the new board.
+    Raises BoardImportError.
+    """
+    stream = JsonStream(source)
+    importer = BoardImporter(owner, name, users)
+    with transaction.atomic():
+        for key in stream.object_items():
+            if key == 'board':
+                importer.start_board(stream.value())
+            elif key == 'lists':
+                for _ in stream.array_items():
+                    read_list(stream, importer)
+            else:
+                stream.value()
+        if not stream.at_end():
+            raise BoardImportError('JSON inválido: hay datos después del documento')
+        board = importer.finish()
+    return board
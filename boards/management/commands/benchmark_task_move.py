@@ -0,0 +1,71 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from boards.models import Board, TaskList, Task
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide cuánto tarda mover una tarea según la longitud de la lista (los datos se descartan)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 500, 2000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"tareas":>8} {"bucle save()":>14} {"UPDATE único":>14} {"move_to":>10}')
+        for size in options['sizes']:
+            timings = [self.measure(size, options['repeat'], method) for method in (
+                self.legacy_move, self.set_based_move, self.gap_move,
+            )]
+            self.stdout.write(f'{size:>8} ' + ' '.join(
+                f'{ms:>{width}.1f}ms' for ms, width in zip(timings, (12, 12, 8))
+            ))
+
+    def measure(self, size, repeat, move):
+        """Best of ``repeat`` moves of the last card to the top of a ``size``-card list"""
+        best = None
+        for _ in range(repeat):
+            try:
+                with transaction.atomic():
+                    task_list, task = self.build_list(size)
+                    start = time.perf_counter()
+                    move(task_list, task)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    raise Rollback
+            except Rollback:
+                pass
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def build_list(self, size):
+        user = User.objects.create(username='benchmark-task-move')
+        board = Board.objects.create(name='Benchmark', owner=user)
+        task_list = TaskList.objects.create(name='Benchmark', board=board)
+        Task.objects.bulk_create([
+            Task(title=f'Tarea {i}', task_list=task_list, position=(i + 1) * Task.POSITION_GAP)
+            for i in range(size)
+        ])
+        return task_list, task_list.tasks.order_by('-position').first()
+
+    def legacy_move(self, task_list, task):
+        """The pre-ordering-service loop: one save() per shifted card"""
+        for other in task_list.tasks.filter(position__lt=task.position):
+            other.position += Task.POSITION_GAP
+            other.save()
+        task.position = Task.POSITION_GAP
+        task.save()
+
+    def set_based_move(self, task_list, task):
+        """The same renumbering as one UPDATE over the shifted range"""
+        task_list.shift_tasks(Task.POSITION_GAP, position__lt=task.position)
+        task.position = Task.POSITION_GAP
+        task.save(update_fields=['position', 'updated_at'])
+
+    def gap_move(self, task_list, task):
+        """What task_move does now: write the moved card only"""
+        task.move_to(task_list, index=0)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from boards.notifications import flush_digests
+
+
+class Command(BaseCommand):
+    help = 'Pasa a la bandeja de salida los resúmenes de asignaciones cuya ventana ha vencido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Enviar todos los resúmenes sin esperar la ventana')
+
+    def handle(self, *args, **options):
+        count = flush_digests(everything=options['all'])
+        self.stdout.write(self.style.SUCCESS(f'{count} resumen(es) en la bandeja de salida'))
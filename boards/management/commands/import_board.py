@@ -0,0 +1,31 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from boards.importer import BoardImportError, import_board
+
+
+class Command(BaseCommand):
+    help = 'Crea un tablero a partir de un archivo exportado en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo JSON generado por la exportación de tableros')
+        parser.add_argument('--owner', required=True, help='Usuario propietario del nuevo tablero')
+        parser.add_argument('--name', help='Nombre del tablero (por defecto, el del archivo)')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f'No existe el usuario {options["owner"]}')
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as source:
+                # Run by an administrator: names may resolve to any user
+                board = import_board(source, owner, options['name'], users=User.objects.all())
+        except (OSError, BoardImportError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Tablero "{board.name}" (id {board.pk}) importado: {board.lists.count()} listas, '
+            f'{board.task_count} tareas en {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from boards.models import Board, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de tareas y comentarios de listas y tableros'
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_ids', nargs='*', type=int, help='Tableros a recalcular (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        boards = Board.objects.all()
+        if options['board_ids']:
+            boards = boards.filter(pk__in=options['board_ids'])
+        rebuild_counters(boards)
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados para {boards.count()} tablero(s)'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from boards.search import clear_search_cache, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo de las tareas'
+
+    def handle(self, *args, **options):
+        count = get_search_backend().rebuild()
+        clear_search_cache()
+        if count is None:
+            self.stdout.write(self.style.SUCCESS('La base de datos mantiene el índice; no hay nada que reconstruir'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{count} tareas indexadas'))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from boards.export import ExportJobLost, claim_export_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Genera los archivos de las exportaciones de cuenta en cola'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Seguir esperando exportaciones nuevas')
+        parser.add_argument('--interval', type=float, default=10, help='Segundos entre comprobaciones con --loop')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        while True:
+            job = claim_export_job()
+            if job is not None:
+                try:
+                    run_export_job(job)
+                except ExportJobLost:
+                    self.stderr.write(f'Exportación {job.pk} reclamada por otro proceso tras vencer su plazo')
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Exportación {job.pk} fallida: {e}')
+                else:
+                    done += 1
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{done} exportaciones terminadas, {failed} fallidas'))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from boards.notifications import send_due_emails
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos pendientes de la bandeja de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Seguir esperando correos nuevos')
+        parser.add_argument('--interval', type=float, default=10, help='Segundos entre lotes vacíos con --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_due_emails(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent + failed == options['batch_size']:
+                continue  # A full batch: more may be waiting
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{total_sent} enviados, {total_failed} fallidos'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión'),
+        ),
+        migrations.AlterField(
+            model_name='tasklist',
+            name='position',
+            field=models.PositiveIntegerField(default=None, verbose_name='Posición'),
+        ),
+    ]
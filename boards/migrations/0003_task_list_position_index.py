@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0002_board_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['task_list', 'position', 'id'], name='task_list_position_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 18:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0003_task_list_position_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Label',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Nombre')),
+                ('normalized', models.CharField(editable=False, max_length=200, verbose_name='Nombre normalizado')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to='boards.board', verbose_name='Tablero')),
+            ],
+            options={
+                'verbose_name': 'Etiqueta',
+                'verbose_name_plural': 'Etiquetas',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Posición')),
+                ('label', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_labels', to='boards.label', verbose_name='Etiqueta')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_labels', to='boards.task', verbose_name='Tarea')),
+            ],
+            options={
+                'verbose_name': 'Etiqueta de tarea',
+                'verbose_name_plural': 'Etiquetas de tareas',
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='board_labels',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='boards.TaskLabel', to='boards.label', verbose_name='Etiquetas del tablero'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklabel',
+            index=models.Index(fields=['label', 'task'], name='task_label_label_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tasklabel',
+            constraint=models.UniqueConstraint(fields=('task', 'label'), name='unique_task_label'),
+        ),
+        migrations.AddConstraint(
+            model_name='label',
+            constraint=models.UniqueConstraint(fields=('board', 'normalized'), name='unique_label_per_board'),
+        ),
+    ]
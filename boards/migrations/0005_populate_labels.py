@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def populate_labels(apps, schema_editor):
+    """Create Label and TaskLabel rows from the comma-separated Task.labels"""
+    Task = apps.get_model('boards', 'Task')
+    Label = apps.get_model('boards', 'Label')
+    TaskLabel = apps.get_model('boards', 'TaskLabel')
+
+    labels = {}
+    task_labels = []
+    tasks = Task.objects.exclude(labels='').values_list('id', 'task_list__board_id', 'labels')
+    for task_id, board_id, text in tasks.iterator(chunk_size=2000):
+        names = {}
+        for name in text.split(','):
+            name = name.strip()
+            if name:
+                names.setdefault(name.lower(), name)
+        for position, (key, name) in enumerate(names.items()):
+            label_id = labels.get((board_id, key))
+            if label_id is None:
+                label_id = Label.objects.create(board_id=board_id, name=name, normalized=key).pk
+                labels[(board_id, key)] = label_id
+            task_labels.append(TaskLabel(task_id=task_id, label_id=label_id, position=position))
+        if len(task_labels) >= 2000:
+            TaskLabel.objects.bulk_create(task_labels)
+            task_labels = []
+    TaskLabel.objects.bulk_create(task_labels)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0004_label'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_labels, migrations.RunPython.noop),
+    ]
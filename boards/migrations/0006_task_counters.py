@@ -0,0 +1,88 @@
+# Generated by Django 4.2 on 2026-10-18 18:16
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    """Fill the new counters with set-based UPDATEs"""
+    Board = apps.get_model('boards', 'Board')
+    TaskList = apps.get_model('boards', 'TaskList')
+    Task = apps.get_model('boards', 'Task')
+    TaskComment = apps.get_model('boards', 'TaskComment')
+
+    def aggregate(queryset, group_by, function):
+        grouped = queryset.order_by().values(group_by).annotate(n=function).values('n')
+        return Coalesce(models.Subquery(grouped), 0)
+
+    Task.objects.update(comment_count=aggregate(
+        TaskComment.objects.filter(task=models.OuterRef('pk')), 'task', models.Count('pk')
+    ))
+    tasks = Task.objects.filter(task_list=models.OuterRef('pk'))
+    TaskList.objects.update(
+        task_count=aggregate(tasks, 'task_list', models.Count('pk')),
+        completed_count=aggregate(tasks.filter(completed=True), 'task_list', models.Count('pk')),
+        due_count=aggregate(tasks.filter(completed=False, due_date__isnull=False), 'task_list', models.Count('pk')),
+        comment_count=aggregate(tasks, 'task_list', models.Sum('comment_count')),
+    )
+    lists = TaskList.objects.filter(board=models.OuterRef('pk'))
+    Board.objects.update(**{
+        field: aggregate(lists, 'board', models.Sum(field))
+        for field in ('task_count', 'completed_count', 'due_count', 'comment_count')
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0005_populate_labels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comentarios'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tareas completadas'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='due_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tareas con fecha límite'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tareas'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comentarios'),
+        ),
+        migrations.AddField(
+            model_name='tasklist',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comentarios'),
+        ),
+        migrations.AddField(
+            model_name='tasklist',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tareas completadas'),
+        ),
+        migrations.AddField(
+            model_name='tasklist',
+            name='due_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tareas con fecha límite'),
+        ),
+        migrations.AddField(
+            model_name='tasklist',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tareas'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+POSITION_GAP = 1024
+
+
+def respace_positions(apps, schema_editor, gap=POSITION_GAP, start=POSITION_GAP):
+    """Renumber every list's tasks start, start + gap, ... in their current order.
+
+    Earlier code could leave duplicate positions; ranking by (position, id)
+    removes them along the way.
+    """
+    Task = apps.get_model('boards', 'Task')
+    tasks = Task.objects.order_by('task_list_id', 'position', 'id').values_list('id', 'task_list_id')
+    batch, current_list, position = [], None, start
+    for task_id, task_list_id in tasks.iterator(chunk_size=2000):
+        if task_list_id != current_list:
+            current_list, position = task_list_id, start
+        batch.append(Task(id=task_id, position=position))
+        position += gap
+        if len(batch) >= 2000:
+            Task.objects.bulk_update(batch, ['position'])
+            batch = []
+    Task.objects.bulk_update(batch, ['position'])
+
+
+def compact_positions(apps, schema_editor):
+    respace_positions(apps, schema_editor, gap=1, start=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0006_task_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='position',
+            field=models.PositiveIntegerField(default=None, verbose_name='Posición'),
+        ),
+        migrations.RunPython(respace_positions, compact_positions),
+    ]
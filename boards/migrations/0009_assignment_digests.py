@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 18:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('boards', '0008_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery', models.CharField(choices=[('immediate', 'Un correo por tarea'), ('digest', 'Resumen periódico')], default='immediate', max_length=10, verbose_name='Entrega de avisos de asignación')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preference', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Preferencia de notificaciones',
+                'verbose_name_plural': 'Preferencias de notificaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='DigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reassigned', models.BooleanField(default=False, verbose_name='Reasignada')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to=settings.AUTH_USER_MODEL, verbose_name='Destinatario')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='boards.task', verbose_name='Tarea')),
+            ],
+            options={
+                'verbose_name': 'Aviso pendiente de resumen',
+                'verbose_name_plural': 'Avisos pendientes de resumen',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='digestitem',
+            index=models.Index(fields=['recipient', 'created_at'], name='digest_item_recipient_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0009_assignment_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('description', models.TextField(blank=True, verbose_name='Descripción')),
+                ('lists', models.JSONField(default=list, help_text='[{"name": "Por hacer", "tasks": [{"title": "Primera tarea"}]}, ...]', verbose_name='Listas')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Plantilla de tablero',
+                'verbose_name_plural': 'Plantillas de tablero',
+                'ordering': ['name'],
+            },
+        ),
+    ]
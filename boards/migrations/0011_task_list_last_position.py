@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 18:34
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_last_position(apps, schema_editor):
+    """Start every list's append sequence at its current last position"""
+    TaskList = apps.get_model('boards', 'TaskList')
+    Task = apps.get_model('boards', 'Task')
+    last = Task.objects.filter(task_list=models.OuterRef('pk')).order_by().values('task_list').annotate(
+        last=models.Max('position')
+    ).values('last')
+    TaskList.objects.update(last_position=Coalesce(models.Subquery(last), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0010_board_template'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasklist',
+            name='last_position',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Última posición asignada'),
+        ),
+        migrations.RunPython(populate_last_position, migrations.RunPython.noop),
+    ]
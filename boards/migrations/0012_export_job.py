@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('boards', '0011_task_list_last_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('include_comments', models.BooleanField(default=False, verbose_name='Incluir comentarios')),
+                ('status', models.CharField(choices=[('pending', 'En cola'), ('running', 'En curso'), ('done', 'Terminada'), ('failed', 'Fallida')], default='pending', max_length=10, verbose_name='Estado')),
+                ('boards_total', models.PositiveIntegerField(default=0, verbose_name='Tableros')),
+                ('boards_done', models.PositiveIntegerField(default=0, verbose_name='Tableros exportados')),
+                ('file', models.CharField(blank=True, max_length=255, verbose_name='Archivo')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Tamaño')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Exportación',
+                'verbose_name_plural': 'Exportaciones',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['status', 'created_at'], name='export_job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+import re
+import unicodedata
+from django.db import migrations
+
+
+# A frozen copy of the stemmer in boards/search.py as of this migration, so
+# the backfill does not change when the live one does. Whenever the live
+# stemmer changes, run rebuild_search_index.
+_WORD = re.compile(r'\w+')
+_SUFFIXES = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'iciones', 'uciones', 'adoras', 'adores',
+    'ancias', 'encias', 'amente', 'mente', 'acion', 'icion', 'ucion', 'adora', 'ador', 'ancia', 'encia',
+    'ando', 'iendo', 'ados', 'idos', 'adas', 'idas', 'ado', 'ido', 'ada', 'ida', 'ar', 'er', 'ir',
+)
+
+
+def stem(word):
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    word = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) >= 5 and word.endswith('ces'):
+        return word[:-3] + 'z'
+    if len(word) >= 5 and word.endswith(('os', 'as', 'es')):
+        word = word[:-2]
+    elif len(word) >= 4 and word[-1] in 'oae':
+        word = word[:-1]
+    return word
+
+
+def stem_text(text):
+    return ' '.join(stem(word) for word in _WORD.findall(text or ''))
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index of tasks for the current database (see search.py)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE boards_task_fts USING fts5(title, description, labels)'
+        )
+        Task = apps.get_model('boards', 'Task')
+        rows = (
+            (pk, stem_text(title), stem_text(description), stem_text(labels))
+            for pk, title, description, labels in Task.objects.values_list(
+                'pk', 'title', 'description', 'labels'
+            ).iterator(chunk_size=2000)
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO boards_task_fts (rowid, title, description, labels) VALUES (%s, %s, %s, %s)', rows
+            )
+    elif vendor == 'postgresql':
+        # Title weighs most, then labels, then description
+        schema_editor.execute(
+            "ALTER TABLE boards_task ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('spanish', coalesce(labels, '')), 'B') || "
+            "setweight(to_tsvector('spanish', coalesce(description, '')), 'C')"
+            ") STORED"
+        )
+        schema_editor.execute('CREATE INDEX boards_task_search_idx ON boards_task USING GIN (search_vector)')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE boards_task_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE boards_task DROP COLUMN search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0012_export_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
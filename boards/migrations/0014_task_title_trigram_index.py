@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    """Index task titles by trigrams on PostgreSQL; elsewhere search.py keeps them in memory"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX boards_task_title_trgm_idx ON boards_task USING GIN (title gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX boards_task_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0013_task_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
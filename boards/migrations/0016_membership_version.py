@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('boards', '0015_task_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='membership_version', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+            ],
+            options={
+                'verbose_name': 'Versión de membresías',
+                'verbose_name_plural': 'Versiones de membresías',
+            },
+        ),
+    ]
@@ -1,16 +1,94 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+from django.dispatch import Signal
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
 
 
-class Board(models.Model):
+COUNTER_FIELDS = ('task_count', 'completed_count', 'due_count', 'comment_count')
+
+# Sent with tasks=[...] by code that inserts tasks with bulk_create(), which
+# fires no post_save, so per-task bookkeeping such as search can catch up
+bulk_tasks_created = Signal()
+
+
+class MaintainedFieldsMixin:
+    """Keep save() from writing columns that are only changed with F() updates.
+
+    A stale instance saving its whole row would otherwise roll those columns
+    back to the values it loaded.
+    """
+    maintained_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (self.maintained_fields and not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.maintained_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class TaskCounters(MaintainedFieldsMixin, models.Model):
+    """Denormalized task counters, kept up to date by the signal handlers"""
+    task_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Tareas")
+    completed_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Tareas completadas")
+    # Pending tasks with a due date: the ones that can become overdue
+    due_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Tareas con fecha límite")
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Comentarios")
+
+    maintained_fields = COUNTER_FIELDS
+
+    class Meta:
+        abstract = True
+
+
+def counter_updates(deltas):
+    """Turn {counter: delta} into F() expressions for QuerySet.update()"""
+    return {field: models.F(field) + delta for field, delta in deltas.items() if delta}
+
+
+class BoardQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Boards the user owns or is a member of, annotated for the board list.
+
+        Adds ``is_owner``, ``list_count`` and ``owner_name`` (the owner's full
+        name, falling back to the username) so listing boards needs no
+        per-board queries.
+        """
+        memberships = Board.members.through.objects.filter(board=models.OuterRef('pk'), user=user)
+        list_count = TaskList.objects.filter(board=models.OuterRef('pk')).order_by().values('board').annotate(
+            n=models.Count('pk')
+        ).values('n')
+        full_name = Trim(Concat('owner__first_name', models.Value(' '), 'owner__last_name'))
+        return self.filter(models.Q(owner=user) | models.Exists(memberships)).annotate(
+            is_owner=models.Case(
+                models.When(owner=user, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+            list_count=Coalesce(models.Subquery(list_count), 0),
+            owner_name=Coalesce(NullIf(full_name, models.Value('')), 'owner__username'),
+        )
+
+
+class Board(TaskCounters):
     name = models.CharField(max_length=100, verbose_name="Nombre")
     description = models.TextField(blank=True, verbose_name="Descripción")
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_boards', verbose_name="Propietario")
     members = models.ManyToManyField(User, related_name='boards', blank=True, verbose_name="Miembros")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
+    # Only ever written by bump_version(), so a stale instance can never roll
+    # it back to a value an old snapshot is cached under
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Versión")
+
+    objects = BoardQuerySet.as_manager()
+
+    maintained_fields = COUNTER_FIELDS + ('version',)
 
     class Meta:
         ordering = ['-updated_at']
@@ -23,12 +101,54 @@ class Board(models.Model):
     def get_absolute_url(self):
         return reverse('board_detail', kwargs={'pk': self.pk})
 
+    @classmethod
+    def bump_version(cls, **filters):
+        """Mark the matching boards as changed, invalidating their cached snapshots"""
+        return cls.objects.filter(**filters).update(
+            version=models.F('version') + 1,
+            updated_at=timezone.now(),
+        )
+
+
+class MembershipVersion(models.Model):
+    """Per-user counter bumped whenever the user's board memberships change.
+
+    Cached membership sets are keyed on it (see access.py). It lives in the
+    database, so a change made by one worker process is seen by every other
+    one, whatever cache backend is configured.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='membership_version', verbose_name="Usuario")
+    version = models.PositiveIntegerField(default=0, verbose_name="Versión")
+
+    class Meta:
+        verbose_name = "Versión de membresías"
+        verbose_name_plural = "Versiones de membresías"
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
+
+    @classmethod
+    def current(cls, user_id):
+        return cls.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
 
-class TaskList(models.Model):
+    @classmethod
+    def bump(cls, user_ids):
+        user_ids = list(user_ids)
+        cls.objects.bulk_create([cls(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        cls.objects.filter(user_id__in=user_ids).update(version=models.F('version') + 1)
+
+
+class TaskList(TaskCounters):
     name = models.CharField(max_length=100, verbose_name="Nombre")
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='lists', verbose_name="Tablero")
-    position = models.PositiveIntegerField(default=0, verbose_name="Posición")
+    # None means "append at the end"; see signals.set_list_position
+    position = models.PositiveIntegerField(default=None, verbose_name="Posición")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    # Highest task position handed out so far; see allocate_positions()
+    last_position = models.PositiveIntegerField(default=0, editable=False, verbose_name="Última posición asignada")
+
+    maintained_fields = COUNTER_FIELDS + ('last_position',)
 
     class Meta:
         ordering = ['position']
@@ -38,19 +158,123 @@ class TaskList(models.Model):
     def __str__(self):
         return f"{self.name} ({self.board.name})"
 
-    def get_next_position(self):
-        """Get the next position for a new task in this list"""
-        last_task = self.tasks.order_by('-position').first()
-        return (last_task.position + 1) if last_task else 0
+    @classmethod
+    def allocate_positions(cls, task_list_id, count=1):
+        """Reserve ``count`` positions at the end of a list and return them.
+
+        The UPDATE takes the list row's write lock until the caller's
+        transaction ends, so concurrent appends get distinct positions
+        without scanning the list's tasks.
+        """
+        step = Task.POSITION_GAP
+        with transaction.atomic():
+            cls.objects.filter(pk=task_list_id).update(last_position=models.F('last_position') + count * step)
+            last = cls.objects.filter(pk=task_list_id).values_list('last_position', flat=True).get()
+        return list(range(last - (count - 1) * step, last + 1, step))
+
+    def position_between(self, lower, upper):
+        """Return a free position strictly between two positions of this list.
+
+        ``None`` stands for the start or the end of the list. When the two
+        positions are adjacent, the cards from ``upper`` on are shifted one
+        gap further in a single UPDATE to make room.
+        """
+        lower = lower or 0
+        if upper is None:
+            # Appending: take the next position from the list's sequence so
+            # later appends still land after this card
+            return TaskList.allocate_positions(self.pk)[0]
+        if upper - lower <= 1:
+            self.shift_tasks(Task.POSITION_GAP, position__gte=upper)
+            upper += Task.POSITION_GAP
+        return (lower + upper) // 2
+
+    def shift_tasks(self, delta, **position_range):
+        """Move a range of this list's tasks by ``delta`` in a single UPDATE.
+
+        Runs no per-row save() or signals; callers save the card they place.
+        Shifted cards still get a new updated_at, so incremental exports
+        pick up their new positions.
+        """
+        if delta > 0:
+            # Keep the append sequence past every shifted card
+            TaskList.objects.filter(pk=self.pk).update(last_position=models.F('last_position') + delta)
+        return self.tasks.filter(**position_range).update(
+            position=models.F('position') + delta, updated_at=timezone.now()
+        )
+
+    def delete(self, *args, **kwargs):
+        # Close the gap the list leaves so list positions stay 0..n-1
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            TaskList.objects.filter(board_id=self.board_id, position__gt=self.position).update(
+                position=models.F('position') - 1
+            )
+        return result
 
+    @staticmethod
+    def adjust_counters(task_list_id, deltas):
+        """Apply {counter: delta} to a list and to its board"""
+        updates = counter_updates(deltas)
+        if updates:
+            TaskList.objects.filter(pk=task_list_id).update(**updates)
+            Board.objects.filter(lists=task_list_id).update(**updates)
 
-class Task(models.Model):
+
+class Label(models.Model):
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='labels', verbose_name="Tablero")
+    name = models.CharField(max_length=200, verbose_name="Nombre")
+    # Lower-cased name: labels match case-insensitively through an indexed equality
+    normalized = models.CharField(max_length=200, editable=False, verbose_name="Nombre normalizado")
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Etiqueta"
+        verbose_name_plural = "Etiquetas"
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'normalized'], name='unique_label_per_board'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def normalize(name):
+        return name.strip().lower()
+
+    def save(self, *args, **kwargs):
+        self.normalized = self.normalize(self.name)
+        super().save(*args, **kwargs)
+
+
+def split_labels(labels):
+    """Split a comma-separated labels string into a list of names"""
+    if labels:
+        return [label.strip() for label in labels.split(',') if label.strip()]
+    return []
+
+
+class TaskQuerySet(models.QuerySet):
+    def with_labels(self):
+        """Prefetch the task labels in their original order for labels_list"""
+        return self.prefetch_related(models.Prefetch(
+            'task_labels', queryset=TaskLabel.objects.select_related('label').order_by('position')
+        ))
+
+
+class Task(MaintainedFieldsMixin, models.Model):
     PRIORITY_CHOICES = [
         ('L', 'Baja'),
         ('M', 'Media'),
         ('H', 'Alta'),
         ('C', 'Crítica'),
     ]
+    PRIORITY_COLORS = {
+        'L': 'success',
+        'M': 'warning',
+        'H': 'danger',
+        'C': 'dark'
+    }
 
     title = models.CharField(max_length=200, verbose_name="Título")
     description = models.TextField(blank=True, verbose_name="Descripción")
@@ -61,15 +285,33 @@ class Task(models.Model):
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, 
                                    related_name='assigned_tasks', verbose_name="Asignado a")
     task_list = models.ForeignKey(TaskList, on_delete=models.CASCADE, related_name='tasks', verbose_name="Lista")
-    position = models.PositiveIntegerField(default=0, verbose_name="Posición")
+    # Spaced POSITION_GAP apart, so placing a card between two others only
+    # writes its own row. None means "append at the end".
+    position = models.PositiveIntegerField(default=None, verbose_name="Posición")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
     completed = models.BooleanField(default=False, verbose_name="Completada")
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Comentarios")
+    # Normalized copy of `labels`, kept in sync by sync_task_labels()
+    board_labels = models.ManyToManyField(Label, through='TaskLabel', related_name='tasks', blank=True,
+                                          verbose_name="Etiquetas del tablero")
+
+    POSITION_GAP = 1024
+
+    objects = TaskQuerySet.as_manager()
+
+    maintained_fields = ('comment_count',)
 
     class Meta:
         ordering = ['position']
         verbose_name = "Tarea"
         verbose_name_plural = "Tareas"
+        indexes = [
+            # Board pages and list pagination walk a list in (position, id) order
+            models.Index(fields=['task_list', 'position', 'id'], name='task_list_position_idx'),
+            # The admin changelist pages through all tasks newest first by cursor
+            models.Index(fields=['created_at', 'id'], name='task_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -82,24 +324,188 @@ class Task(models.Model):
     @property
     def priority_color(self):
         """Return CSS class for priority color"""
-        colors = {
-            'L': 'success',
-            'M': 'warning',
-            'H': 'danger',
-            'C': 'dark'
-        }
-        return colors.get(self.priority, 'secondary')
+        return self.PRIORITY_COLORS.get(self.priority, 'secondary')
 
     @property
     def labels_list(self):
         """Return labels as a list"""
-        if self.labels:
-            return [label.strip() for label in self.labels.split(',') if label.strip()]
-        return []
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('task_labels')
+        if prefetched is not None:
+            return [task_label.label.name for task_label in prefetched]
+        return split_labels(self.labels)
 
     def get_absolute_url(self):
         return reverse('task_detail', kwargs={'pk': self.pk})
 
+    # Values of the concrete fields as last read from or written to the
+    # database, keyed by attname; None for instances that never were
+    loaded_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        # Reading a deferred field refreshes just that field: the others may
+        # hold changes that are not saved yet and must still count as changed
+        self._remember_loaded_values(fields)
+
+    def _remember_loaded_values(self, fields=None):
+        # Deferred fields are absent from __dict__ and stay untracked
+        if fields is not None:
+            fields = set(fields)
+        loaded = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (fields is None or field.name in fields or field.attname in fields)
+        }
+        if fields is None:
+            self.loaded_values = loaded
+        else:
+            self.loaded_values = {**(self.loaded_values or {}), **loaded}
+
+    @property
+    def changed_fields(self):
+        """Names of the fields that differ from their stored values.
+
+        Every field counts as changed for a task that was never loaded
+        from or saved to the database.
+        """
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        if self.loaded_values is None:
+            return {field.name for field in fields}
+        return {
+            field.name for field in fields
+            if field.attname in self.__dict__
+            and self.loaded_values.get(field.attname, models.NOT_PROVIDED) != self.__dict__[field.attname]
+        }
+
+    def save(self, *args, **kwargs):
+        if (self.loaded_values is not None and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            # Only write what changed; an unchanged task is not saved at all,
+            # so no signal handler runs for it either
+            changed = self.changed_fields - set(self.maintained_fields)
+            if not changed:
+                return
+            kwargs['update_fields'] = changed | {'updated_at'}
+        # The counter updates run in signal handlers; they must commit or
+        # roll back together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._remember_loaded_values()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+    def move_to(self, task_list, previous_id=None, next_id=None, index=None):
+        """Place the task in ``task_list`` after/before the given neighbours.
+
+        The client sends the ids of the cards it dropped the task between;
+        the index among the list's cards is only a fallback for when neither
+        neighbour is in the list any more. Only this row is written, unless
+        the neighbours leave no room (see TaskList.position_between).
+        """
+        others = task_list.tasks.exclude(pk=self.pk).order_by('position', 'id')
+        positions = others.values_list('position', flat=True)
+        lower = positions.filter(pk=previous_id).first() if previous_id else None
+        upper = positions.filter(pk=next_id).first() if next_id else None
+        if lower is not None:
+            upper = positions.filter(position__gt=lower).first()
+        elif upper is not None:
+            lower = positions.filter(position__lt=upper).last()
+        elif index:
+            window = list(positions[index - 1:index + 1])
+            lower = window[0] if window else positions.last()
+            upper = window[1] if len(window) > 1 else None
+        else:
+            upper = positions.first()
+
+        self.task_list = task_list
+        self.position = task_list.position_between(lower, upper)
+        self.save()
+
+    @staticmethod
+    def counter_values(completed, due_date, comment_count):
+        """What a task with this state adds to its list and board counters"""
+        return {
+            'task_count': 1,
+            'completed_count': int(bool(completed)),
+            'due_count': int(due_date is not None and not completed),
+            'comment_count': comment_count,
+        }
+
+
+class TaskLabel(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='task_labels', verbose_name="Tarea")
+    label = models.ForeignKey(Label, on_delete=models.CASCADE, related_name='task_labels', verbose_name="Etiqueta")
+    position = models.PositiveSmallIntegerField(default=0, verbose_name="Posición")
+
+    class Meta:
+        ordering = ['position']
+        verbose_name = "Etiqueta de tarea"
+        verbose_name_plural = "Etiquetas de tareas"
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'label'], name='unique_task_label'),
+        ]
+        indexes = [
+            # "All tasks with label X" walks this index from the label side
+            models.Index(fields=['label', 'task'], name='task_label_label_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.label.name} en {self.task.title}"
+
+
+def sync_task_labels(tasks):
+    """Mirror the comma-separated `labels` of the given tasks into Label rows.
+
+    Works in a handful of queries whatever the number of tasks, so bulk
+    writers (imports, templates) can call it once for everything they created.
+    """
+    tasks = [task for task in tasks if task.pk]
+    if not tasks:
+        return
+    board_ids = dict(TaskList.objects.filter(
+        pk__in={task.task_list_id for task in tasks}
+    ).values_list('id', 'board_id'))
+
+    wanted = {}
+    for task in tasks:
+        names = {}
+        for name in split_labels(task.labels):
+            names.setdefault(Label.normalize(name), name)
+        wanted[task] = (board_ids[task.task_list_id], names)
+
+    needed = {(board_id, key): name for board_id, names in wanted.values() for key, name in names.items()}
+    labels = {}
+    if needed:
+        board_filter = models.Q(board_id__in={board_id for board_id, _ in needed})
+        key_filter = models.Q(normalized__in={key for _, key in needed})
+        for label in Label.objects.filter(board_filter & key_filter):
+            labels[(label.board_id, label.normalized)] = label
+        missing = [
+            Label(board_id=board_id, name=name, normalized=key)
+            for (board_id, key), name in needed.items() if (board_id, key) not in labels
+        ]
+        if missing:
+            # ignore_conflicts: a concurrent writer may have created the same label
+            Label.objects.bulk_create(missing, ignore_conflicts=True)
+            for label in Label.objects.filter(board_filter & key_filter):
+                labels[(label.board_id, label.normalized)] = label
+
+    TaskLabel.objects.filter(task__in=tasks).delete()
+    TaskLabel.objects.bulk_create([
+        TaskLabel(task=task, label=labels[(board_id, key)], position=position)
+        for task, (board_id, names) in wanted.items()
+        for position, key in enumerate(names)
+    ])
+
 
 class TaskComment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments', verbose_name="Tarea")
@@ -114,3 +520,240 @@ class TaskComment(models.Model):
 
     def __str__(self):
         return f"Comentario de {self.author.username} en {self.task.title}"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+DEFAULT_BOARD_LISTS = [
+    {'name': 'Por hacer'},
+    {'name': 'En progreso'},
+    {'name': 'Terminado'},
+]
+
+
+def populate_board(board, lists, first_position=0):
+    """Create the lists and seed cards described by ``lists`` on ``board``.
+
+    ``lists`` is a list of {"name": ..., "tasks": [{"title": ..., ...}]}
+    dicts, as stored in BoardTemplate.lists. One INSERT per model is issued
+    whatever the number of lists and cards; positions and counters are
+    filled in here, since bulk_create() runs no signal handlers.
+    """
+    task_lists = [
+        TaskList(board=board, name=spec['name'], position=first_position + i,
+                 task_count=len(spec.get('tasks', [])),
+                 last_position=len(spec.get('tasks', [])) * Task.POSITION_GAP)
+        for i, spec in enumerate(lists)
+    ]
+    TaskList.objects.bulk_create(task_lists)
+
+    tasks = [
+        Task(
+            task_list=task_list,
+            title=card['title'],
+            description=card.get('description', ''),
+            priority=card.get('priority', 'M'),
+            labels=card.get('labels', ''),
+            position=(i + 1) * Task.POSITION_GAP,
+        )
+        for task_list, spec in zip(task_lists, lists)
+        for i, card in enumerate(spec.get('tasks', []))
+    ]
+    if tasks:
+        Task.objects.bulk_create(tasks)
+        sync_task_labels(tasks)
+        bulk_tasks_created.send(sender=Task, tasks=tasks)
+        Board.objects.filter(pk=board.pk).update(task_count=models.F('task_count') + len(tasks))
+    return task_lists
+
+
+class BoardTemplate(models.Model):
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nombre")
+    description = models.TextField(blank=True, verbose_name="Descripción")
+    lists = models.JSONField(default=list, verbose_name="Listas",
+                             help_text='[{"name": "Por hacer", "tasks": [{"title": "Primera tarea"}]}, ...]')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Plantilla de tablero"
+        verbose_name_plural = "Plantillas de tablero"
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        valid_priorities = dict(Task.PRIORITY_CHOICES)
+        if not isinstance(self.lists, list) or not self.lists:
+            raise ValidationError({'lists': 'Debe ser una lista no vacía de listas.'})
+        for spec in self.lists:
+            if not isinstance(spec, dict) or not str(spec.get('name', '')).strip():
+                raise ValidationError({'lists': 'Cada lista necesita un "name".'})
+            for card in spec.get('tasks', []):
+                if not isinstance(card, dict) or not str(card.get('title', '')).strip():
+                    raise ValidationError({'lists': 'Cada tarea necesita un "title".'})
+                if card.get('priority', 'M') not in valid_priorities:
+                    raise ValidationError({'lists': f'Prioridad desconocida: {card["priority"]}'})
+
+    def apply(self, board):
+        """Add this template's lists and seed cards after the board's lists"""
+        last = board.lists.aggregate(last=models.Max('position'))['last']
+        task_lists = populate_board(board, self.lists, 0 if last is None else last + 1)
+        Board.bump_version(pk=board.pk)
+        return task_lists
+
+
+class OutgoingEmail(models.Model):
+    """An email waiting in the outbox for the send_notifications worker.
+
+    Rows are written in the same transaction as the change they report, so
+    a rolled-back change never sends mail and requests never wait on SMTP.
+    """
+    recipient = models.EmailField(verbose_name="Destinatario")
+    subject = models.CharField(max_length=255, verbose_name="Asunto")
+    body = models.TextField(verbose_name="Mensaje")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    # Next time the worker may pick the row up; pushed back after a failure
+    send_after = models.DateTimeField(default=timezone.now, verbose_name="Enviar después de")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de envío")
+
+    class Meta:
+        ordering = ['send_after', 'id']
+        verbose_name = "Correo saliente"
+        verbose_name_plural = "Correos salientes"
+        indexes = [
+            models.Index(fields=['sent_at', 'send_after'], name='outgoing_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.recipient}"
+
+
+class NotificationPreference(models.Model):
+    IMMEDIATE = 'immediate'
+    DIGEST = 'digest'
+    DELIVERY_CHOICES = [
+        (IMMEDIATE, 'Un correo por tarea'),
+        (DIGEST, 'Resumen periódico'),
+    ]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_preference',
+                                verbose_name="Usuario")
+    delivery = models.CharField(max_length=10, choices=DELIVERY_CHOICES, default=IMMEDIATE,
+                                verbose_name="Entrega de avisos de asignación")
+
+    class Meta:
+        verbose_name = "Preferencia de notificaciones"
+        verbose_name_plural = "Preferencias de notificaciones"
+
+    def __str__(self):
+        return f"{self.user.username}: {self.get_delivery_display()}"
+
+    @classmethod
+    def wants_digest(cls, user_id):
+        return cls.objects.filter(user_id=user_id, delivery=cls.DIGEST).exists()
+
+
+class DigestItem(models.Model):
+    """An assignment waiting to go out in the recipient's next digest email"""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digest_items',
+                                  verbose_name="Destinatario")
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='+', verbose_name="Tarea")
+    reassigned = models.BooleanField(default=False, verbose_name="Reasignada")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name = "Aviso pendiente de resumen"
+        verbose_name_plural = "Avisos pendientes de resumen"
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='digest_item_recipient_idx'),
+        ]
+
+
+class ExportJob(models.Model):
+    """An archive of every board a user can access, built by the run_exports worker"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'En cola'),
+        (RUNNING, 'En curso'),
+        (DONE, 'Terminada'),
+        (FAILED, 'Fallida'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs', verbose_name="Usuario")
+    include_comments = models.BooleanField(default=False, verbose_name="Incluir comentarios")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Estado")
+    boards_total = models.PositiveIntegerField(default=0, verbose_name="Tableros")
+    boards_done = models.PositiveIntegerField(default=0, verbose_name="Tableros exportados")
+    # Path of the archive relative to MEDIA_ROOT
+    file = models.CharField(max_length=255, blank=True, verbose_name="Archivo")
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Tamaño")
+    error = models.TextField(blank=True, verbose_name="Error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    # Renewed by the worker after every board: a running job whose heartbeat
+    # is older than EXPORT_LEASE lost its worker (see claim_export_job)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Última señal")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name = "Exportación"
+        verbose_name_plural = "Exportaciones"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Exportación {self.pk} de {self.user}"
+
+    @property
+    def progress(self):
+        """Percentage of boards written so far"""
+        if self.status == self.DONE:
+            return 100
+        if not self.boards_total:
+            return 0
+        return self.boards_done * 100 // self.boards_total
+
+
+def rebuild_counters(boards=None):
+    """Recompute every denormalized counter (and the lists' append sequence).
+
+    Runs three set-based UPDATEs (tasks, then lists, then boards),
+    optionally restricted to a queryset of boards.
+    """
+    boards = Board.objects.all() if boards is None else boards
+
+    def aggregate(queryset, group_by, function):
+        grouped = queryset.order_by().values(group_by).annotate(n=function).values('n')
+        return Coalesce(models.Subquery(grouped), 0)
+
+    tasks = Task.objects.filter(task_list=models.OuterRef('pk'))
+    lists = TaskList.objects.filter(board=models.OuterRef('pk'))
+    with transaction.atomic():
+        Task.objects.filter(task_list__board__in=boards).update(comment_count=aggregate(
+            TaskComment.objects.filter(task=models.OuterRef('pk')), 'task', models.Count('pk')
+        ))
+        TaskList.objects.filter(board__in=boards).update(
+            task_count=aggregate(tasks, 'task_list', models.Count('pk')),
+            completed_count=aggregate(tasks.filter(completed=True), 'task_list', models.Count('pk')),
+            due_count=aggregate(tasks.filter(completed=False, due_date__isnull=False), 'task_list',
+                                models.Count('pk')),
+            comment_count=aggregate(tasks, 'task_list', models.Sum('comment_count')),
+            last_position=aggregate(tasks, 'task_list', models.Max('position')),
+        )
+        boards.update(**{field: aggregate(lists, 'board', models.Sum(field)) for field in COUNTER_FIELDS})
@@ -0,0 +1,131 @@
+from datetime import timedelta
+from itertools import groupby
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from .models import OutgoingEmail, DigestItem
+
+
+def queue_email(recipient, subject, body):
+    """Put an email in the outbox, inside the caller's transaction"""
+    return OutgoingEmail.objects.create(recipient=recipient, subject=subject, body=body)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2 * base, 4 * base, ... capped at one day"""
+    base = getattr(settings, 'NOTIFICATION_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 24 * 60 * 60))
+
+
+def claim_due_emails(batch_size):
+    """Lease a batch of due emails so concurrent workers skip them"""
+    now = timezone.now()
+    lease = now + timedelta(seconds=getattr(settings, 'NOTIFICATION_LEASE', 300))
+    with transaction.atomic():
+        emails = list(OutgoingEmail.objects.select_for_update(skip_locked=True).filter(
+            sent_at__isnull=True,
+            send_after__lte=now,
+            attempts__lt=getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5),
+        )[:batch_size])
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(send_after=lease)
+    return emails
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.send_after = timezone.now() + retry_delay(email.attempts)
+
+
+def send_due_emails(batch_size=100):
+    """Send one batch of due outbox emails over a single SMTP connection.
+
+    Failed emails are retried later with exponential backoff until
+    NOTIFICATION_MAX_ATTEMPTS is reached. Returns (sent, failed).
+    """
+    emails = claim_due_emails(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _record_failure(email, e)
+    else:
+        with connection:
+            for email in emails:
+                try:
+                    EmailMessage(
+                        email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.recipient],
+                        connection=connection,
+                    ).send()
+                except Exception as e:
+                    _record_failure(email, e)
+                else:
+                    email.sent_at = timezone.now()
+                    sent += 1
+
+    OutgoingEmail.objects.bulk_update(emails, ['attempts', 'last_error', 'send_after', 'sent_at'])
+    return sent, len(emails) - sent
+
+
+def digest_email(recipient, items):
+    """Build the (subject, body) of one digest listing every buffered task"""
+    tasks = list({item.task_id: item.task for item in items}.values())
+    if len(tasks) == 1:
+        subject = 'Resumen: 1 tarea asignada'
+    else:
+        subject = f'Resumen: {len(tasks)} tareas asignadas'
+    lines = [
+        f'- {task.title} ({task.task_list.board.name} / {task.task_list.name}) · '
+        f'Prioridad: {task.get_priority_display()} · Fecha límite: {task.due_date or "Sin fecha límite"}'
+        for task in tasks
+    ]
+    body = f'''
+Hola {recipient.first_name or recipient.username},
+
+Se te han asignado estas tareas:
+
+{chr(10).join(lines)}
+
+Puedes verlas en tus tableros para más detalles.
+
+Saludos,
+Equipo Trello Clone
+    '''
+    return subject, body
+
+
+def flush_digests(everything=False):
+    """Queue one outbox email per recipient whose digest window has elapsed.
+
+    A recipient is due once their oldest buffered assignment is older than
+    NOTIFICATION_DIGEST_WINDOW seconds (or always with ``everything``). All
+    due recipients are handled with a fixed number of queries. Returns the
+    number of digests queued.
+    """
+    now = timezone.now()
+    window = timedelta(seconds=getattr(settings, 'NOTIFICATION_DIGEST_WINDOW', 300))
+    with transaction.atomic():
+        due = DigestItem.objects.values('recipient').annotate(oldest=Min('created_at'))
+        if not everything:
+            due = due.filter(oldest__lte=now - window)
+        items = list(DigestItem.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            recipient__in=due.values('recipient'), created_at__lte=now,
+        ).select_related('recipient', 'task__task_list__board').order_by('recipient_id', 'created_at', 'id'))
+
+        emails = []
+        for _, group in groupby(items, key=lambda item: item.recipient_id):
+            group = list(group)
+            recipient = group[0].recipient
+            if recipient.email:
+                subject, body = digest_email(recipient, group)
+                emails.append(OutgoingEmail(recipient=recipient.email, subject=subject, body=body))
+        OutgoingEmail.objects.bulk_create(emails)
+        DigestItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+    return len(emails)
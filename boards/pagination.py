@@ -0,0 +1,302 @@
+import base64
+import json
+from datetime import date, datetime, time
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+
+CURSOR_VAR = 'cursor'
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not made by this module, or for another ordering"""
+
+
+def _json_value(value):
+    # isoformat() keeps the microseconds DjangoJSONEncoder would drop,
+    # which the equality half of the keyset filter depends on
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} no es una clave de orden válida')
+
+
+def encode_cursor(values, backwards=False):
+    """Opaque, URL-safe cursor for the sort key ``values`` of a row"""
+    data = json.dumps([int(backwards), list(values)], default=_json_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (values, backwards) of a cursor, raising InvalidCursor if malformed"""
+    try:
+        backwards, values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values, bool(backwards)
+
+
+def keyset_filter(ordering, values, backwards=False, nullable=()):
+    """Q for the rows after ``values`` in ``ordering`` (before them if backwards).
+
+    ``ordering`` is a list of field names, descending ones prefixed with
+    "-", ending in a unique field. For (a, -b, id) this is
+    a > va OR (a = va AND b < vb) OR (a = va AND b = vb AND id > vid).
+    NULLs of the fields in ``nullable`` sort after every value, as
+    _order_by() asks the database to.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        greater = descending == backwards
+        if value is None:
+            # Nothing sorts after NULL, and every value before it
+            step = None if greater else Q(**{f'{name}__isnull': False})
+        else:
+            step = Q(**{f'{name}__{"gt" if greater else "lt"}': value})
+            if greater and name in nullable:
+                step |= Q(**{f'{name}__isnull': True})
+        if step is not None:
+            # An equality on None becomes IS NULL
+            condition |= Q(**equal) & step
+        equal[name] = value
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _order_by(ordering, nullable):
+    """order_by() arguments for ``ordering``, NULLs last (first when descending)"""
+    order_by = []
+    for field in ordering:
+        name = field.lstrip('-')
+        if name not in nullable:
+            order_by.append(field)
+        elif field.startswith('-'):
+            order_by.append(F(name).desc(nulls_first=True))
+        else:
+            order_by.append(F(name).asc(nulls_last=True))
+    return order_by
+
+
+class CursorPage:
+    """One page of rows, with the cursors of the pages on either side"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _cursor_page(rows, key, per_page, cursor, backwards):
+    """Trim rows fetched with per_page + 1 into a CursorPage.
+
+    Rows read backwards arrive in reverse order. Coming from a cursor there
+    is always something on the side it was made from.
+    """
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    has_next = bool(cursor) if backwards else has_more
+    has_previous = has_more if backwards else bool(cursor)
+    if not rows:
+        return CursorPage(rows)
+    return CursorPage(
+        rows,
+        next_cursor=encode_cursor(key(rows[-1])) if has_next else None,
+        previous_cursor=encode_cursor(key(rows[0]), backwards=True) if has_previous else None,
+    )
+
+
+class KeysetPaginator:
+    """Page through a queryset by sort key instead of OFFSET.
+
+    Each page is fetched with a WHERE on the sort key of the row the
+    cursor names, so with an index on the ordering every page costs the
+    same as the first. The ordering (by default the queryset's) is made of
+    field names; like order_by(), a relation sorts by its model's ordering
+    (or its id), and NULLs sort after every value. It must end in a unique
+    field; "pk" is appended otherwise. Rows can be model instances or
+    values() dicts.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = []
+        self.nullable = set()
+        expanded = []
+        for field in ordering or queryset.query.order_by or queryset.model._meta.ordering:
+            if not isinstance(field, str) or field.lstrip('-') in ('', '?'):
+                raise ValueError(f'Orden no admitido en paginación por cursor: {field!r}')
+            expanded += self._expand(field)
+        ordering = []
+        for field in expanded:
+            name = self._check(field.lstrip('-'))
+            # A column can only appear once in a sort key, e.g. sorting by a
+            # list and then by its position
+            if name not in self.fields:
+                self.fields.append(name)
+                ordering.append(field)
+        if not any(self._is_unique(name) for name in self.fields):
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+            self.fields.append(self._check('pk'))
+        self.ordering = ordering
+
+    def _resolve(self, name):
+        model = self.queryset.model
+        *path, last = name.split('__')
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.pk if last == 'pk' else model._meta.get_field(last)
+
+    def _expand(self, field):
+        """The fields an ordering on ``field`` sorts by, following relations as order_by() does"""
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        model_field = self._resolve(name)
+        last = name.split('__')[-1]
+        if not model_field.is_relation or model_field.primary_key or last == model_field.attname:
+            return [field]
+        related_ordering = model_field.related_model._meta.ordering
+        if not related_ordering:
+            return [('-' if descending else '') + name[:-len(last)] + model_field.attname]
+        expanded = []
+        for related in related_ordering:
+            if not isinstance(related, str):
+                raise ValueError(f'Orden no admitido en paginación por cursor: {related!r}')
+            flip = related.startswith('-') != descending
+            expanded += self._expand(('-' if flip else '') + f'{name}__{related.lstrip("-")}')
+        return expanded
+
+    def _check(self, name):
+        field = self._resolve(name)
+        if field.is_relation and not field.primary_key and name.split('__')[-1] != field.attname:
+            raise ValueError(f'"{name}" no sirve como clave de paginación: es una relación')
+        if field.null:
+            self.nullable.add(name)
+        # values() rows are keyed by the real name of the primary key
+        return field.name if name == 'pk' else name
+
+    def _is_unique(self, name):
+        return '__' not in name and self._resolve(name).unique
+
+    def key(self, row):
+        """Sort key values of a row"""
+        if isinstance(row, dict):
+            return [row[name] for name in self.fields]
+        values = []
+        for name in self.fields:
+            value = row
+            for part in name.split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def page(self, cursor=None):
+        """The page following (or, for a "previous" cursor, preceding) ``cursor``"""
+        queryset = self.queryset
+        backwards = False
+        if cursor:
+            values, backwards = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            try:
+                queryset = queryset.filter(keyset_filter(self.ordering, values, backwards, self.nullable))
+            except (ValidationError, TypeError, ValueError):
+                # Values of another ordering, e.g. a datetime field given a title
+                raise InvalidCursor(cursor)
+        ordering = _reverse(self.ordering) if backwards else self.ordering
+        rows = list(queryset.order_by(*_order_by(ordering, self.nullable))[:self.per_page + 1])
+        return _cursor_page(rows, self.key, self.per_page, cursor, backwards)
+
+    def get_page(self, cursor=None):
+        """Like page(), but a malformed cursor gives the first page"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+def paginate_ranked_ids(ids, per_page, cursor=None):
+    """Page through a ranked list of ids (e.g. cached search results) by cursor.
+
+    The sort key is each id's rank in the list, kept with the id itself to
+    find it again if the list has changed since the cursor was made. A
+    malformed cursor gives the first page.
+    """
+    try:
+        (rank, pk), backwards = decode_cursor(cursor)
+        rank = int(rank)
+    except (InvalidCursor, TypeError, ValueError):
+        cursor, backwards = None, False
+    if not cursor:
+        rows = list(enumerate(ids[:per_page + 1]))
+    else:
+        if not (0 <= rank < len(ids) and ids[rank] == pk):
+            rank = ids.index(pk) if pk in ids else min(max(rank, 0), len(ids))
+        if backwards:
+            start = max(rank - per_page - 1, 0)
+            rows = list(enumerate(ids[start:rank], start))[::-1]
+        else:
+            rows = list(enumerate(ids[rank + 1:rank + per_page + 2], rank + 1))
+    page = _cursor_page(rows, list, per_page, cursor, backwards)
+    page.object_list = [pk for _, pk in page.object_list]
+    return page
+
+
+class ChangeListPaginator(Paginator):
+    """Paginator for admin changelists that pages by cursor.
+
+    The changelist still asks for page numbers; page() ignores them and
+    serves the page of the cursor the ModelAdmin took out of the request
+    (see admin.py). The admin pagination.html override links to the
+    neighbouring pages through ``current_page``. Rows are only counted up
+    to ADMIN_COUNT_LIMIT (``capped`` tells whether there were more), so
+    no page pays for a COUNT(*) of the whole table.
+    """
+
+    def __init__(self, object_list, per_page, cursor=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cursor = cursor
+        self.current_page = None
+        self.capped = False
+
+    @cached_property
+    def count(self):
+        # Counting no more than a page would make the changelist show every row at once
+        limit = max(getattr(settings, 'ADMIN_COUNT_LIMIT', 1000), self.per_page + 1)
+        count = self.object_list[:limit + 1].count()
+        self.capped = count > limit
+        return min(count, limit)
+
+    def page(self, number):
+        self.current_page = KeysetPaginator(self.object_list, self.per_page).get_page(self.cursor)
+        return self.current_page
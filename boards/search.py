@@ -0,0 +1,491 @@
+import hashlib
+import html
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, Case, Count, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+from .access import member_board_ids
+from .models import Board, Label, Task, TaskLabel
+
+
+_WORD = re.compile(r'\w+')
+
+# Derivational and verb endings, longest first; see stem()
+_SUFFIXES = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'iciones', 'uciones', 'adoras', 'adores',
+    'ancias', 'encias', 'amente', 'mente', 'acion', 'icion', 'ucion', 'adora', 'ador', 'ancia', 'encia',
+    'ando', 'iendo', 'ados', 'idos', 'adas', 'idas', 'ado', 'ido', 'ada', 'ida', 'ar', 'er', 'ir',
+)
+
+
+def fold(word):
+    """Lowercase a word and strip its accents ("Diseño" -> "diseno")"""
+    if word.isascii():
+        return word.lower()
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Light Spanish stemmer: accents, one derivational/verb ending, then gender and number.
+
+    Deliberately conservative (every rule keeps at least three letters) so
+    "diseño", "diseños", "diseñar" and "diseñando" all become "disen"
+    without merging unrelated short words.
+    """
+    word = fold(word)
+    if word.endswith(_SUFFIXES):
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)]
+                break
+    if len(word) >= 5 and word.endswith('ces'):
+        return word[:-3] + 'z'  # luces -> luz
+    if len(word) >= 5 and word.endswith(('os', 'as', 'es')):
+        word = word[:-2]
+    elif len(word) >= 4 and word[-1] in 'oae':
+        word = word[:-1]
+    return word
+
+
+def stem_text(text):
+    return ' '.join(stem(word) for word in _WORD.findall(text or ''))
+
+
+def query_terms(query):
+    """Stems of the words of a search query, in order and without repeats"""
+    return list(dict.fromkeys(stem(word) for word in _WORD.findall(query)))
+
+
+def highlight(text, query, words=20):
+    """Escape ``text`` and wrap the words matching ``query`` in <mark>.
+
+    Long texts are cut to a window of ``words`` words around the first
+    match, like a search engine snippet.
+    """
+    terms = query_terms(query)
+    tokens = re.split(r'(\w+)', text or '')
+    matches = [index for index in range(1, len(tokens), 2)
+               if any(stem(tokens[index]).startswith(term) for term in terms)]
+
+    start, end, prefix, suffix = 0, len(tokens), '', ''
+    if len(tokens) // 2 > words:
+        first = matches[0] if matches else 1
+        start = max(first - words // 2 * 2, 0)
+        start -= start % 2  # keep the separator before the window's first word
+        end = min(start + words * 2, len(tokens))
+        prefix = '… ' if start else ''
+        suffix = ' …' if end < len(tokens) else ''
+
+    marked = set(matches)
+    pieces = [
+        f'<mark>{html.escape(token)}</mark>' if index in marked else html.escape(token)
+        for index, token in enumerate(tokens[start:end], start)
+    ]
+    return mark_safe(prefix + ''.join(pieces).strip() + suffix)
+
+
+# Share of the query's trigrams a title must hold to be suggested
+SUGGEST_SIMILARITY = 0.5
+
+
+def trigrams(text):
+    """Trigrams of the folded words, padded like pg_trgm ("  d", " di", "dis", ...)"""
+    grams = set()
+    for word in _WORD.findall(fold(text)):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TitleIndex:
+    """Trigram postings of the task titles of one board"""
+
+    def __init__(self, tasks):
+        self.postings = defaultdict(list)
+        for pk, title in tasks:
+            for gram in trigrams(title):
+                self.postings[gram].append(pk)
+
+    def match(self, grams):
+        """(similarity, task id) of the titles holding enough of the trigrams"""
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.postings.get(gram, ()))
+        needed = len(grams) * SUGGEST_SIMILARITY
+        return [(count / len(grams), pk) for pk, count in hits.items() if count >= needed]
+
+
+_title_indexes = OrderedDict()
+_title_indexes_lock = threading.Lock()
+
+
+def board_title_indexes(boards):
+    """The TitleIndex of each (board id, version) pair, building the missing ones.
+
+    Each worker process keeps the indexes of the boards it served last:
+    SUGGEST_INDEX_BOARDS of them, or all of one request's boards if there
+    are more, so a user with many boards does not evict the very indexes
+    their next keystroke needs. Any write to a board bumps its version, so
+    the next lookup rebuilds the index instead of answering from stale
+    titles, whichever process made the change.
+    """
+    indexes = []
+    for board_id, version in boards:
+        with _title_indexes_lock:
+            entry = _title_indexes.get(board_id)
+            if entry is not None and entry[0] == version:
+                _title_indexes.move_to_end(board_id)
+                indexes.append(entry[1])
+                continue
+        index = TitleIndex(Task.objects.filter(task_list__board=board_id).values_list('pk', 'title').iterator())
+        with _title_indexes_lock:
+            _title_indexes[board_id] = (version, index)
+            _title_indexes.move_to_end(board_id)
+        indexes.append(index)
+    with _title_indexes_lock:
+        capacity = max(getattr(settings, 'SUGGEST_INDEX_BOARDS', 200), len(boards))
+        while len(_title_indexes) > capacity:
+            _title_indexes.popitem(last=False)
+    return indexes
+
+
+class SearchBackend:
+    """Substring search with icontains filters: works anywhere, ranks nothing.
+
+    Subclasses keep a full-text index. The Task signals (and bulk writers,
+    through bulk_tasks_created) call index() and remove() to keep it in step.
+    """
+    ranked = False
+
+    def normalize(self, query):
+        """The form of the query results depend on, used in cache keys"""
+        return ' '.join(query.lower().split())
+
+    def search(self, tasks, query):
+        """Filter a Task queryset down to the matches, best first"""
+        has_label = Exists(TaskLabel.objects.filter(task=OuterRef('pk'), label__normalized=Label.normalize(query)))
+        return tasks.filter(Q(title__icontains=query) | Q(description__icontains=query) | has_label)
+
+    def suggest(self, boards, query, limit=10):
+        """Ids of the tasks whose titles best match a partly typed query.
+
+        ``boards`` are the (id, version) pairs to look in. Titles are
+        compared by trigrams, so misspelt words still match.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        matches = []
+        for index in board_title_indexes(boards):
+            matches += index.match(grams)
+        return [pk for _, pk in heapq.nlargest(limit, matches)]
+
+    def index(self, tasks):
+        pass
+
+    def remove(self, task_ids):
+        pass
+
+    def rebuild(self):
+        """Reindex every task and return how many were indexed (None if the database does it)"""
+        return None
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 table holding the stemmed title, description and labels of each task.
+
+    SQLite has no Spanish tokenizer, so the text is stemmed here before it
+    is indexed and queries are stemmed the same way. The table's rowid is
+    the task id.
+    """
+    ranked = True
+    table = 'boards_task_fts'
+    # bm25() column weights: title, description, labels
+    weights = (10.0, 1.0, 5.0)
+    batch_size = 2000
+
+    def normalize(self, query):
+        return ' '.join(query_terms(query))
+
+    def match_expression(self, query):
+        # Each stem as a quoted prefix: "disen"* matches diseño, diseñador...
+        return ' '.join(f'"{term}"*' for term in query_terms(query))
+
+    def search(self, tasks, query):
+        match = self.match_expression(query)
+        if not match:
+            return tasks.none()
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return tasks.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = {Task._meta.db_table}.id', f'{self.table} MATCH %s'],
+            params=[match],
+            # bm25() is lower for better matches
+            select={'search_rank': f'-bm25({self.table}, {weights})'},
+        ).order_by('-search_rank', '-pk')
+
+    def _rows(self, tasks):
+        return [(pk, stem_text(title), stem_text(description), stem_text(labels))
+                for pk, title, description, labels in tasks]
+
+    def _insert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {self.table} (rowid, title, description, labels) VALUES (%s, %s, %s, %s)', rows
+        )
+
+    def index(self, tasks):
+        rows = self._rows((task.pk, task.title, task.description, task.labels) for task in tasks)
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            self._insert(cursor, rows)
+
+    def remove(self, task_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in task_ids])
+
+    def rebuild(self):
+        count = 0
+        tasks = Task.objects.order_by('pk').values_list('pk', 'title', 'description', 'labels')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            batch = []
+            for row in tasks.iterator(chunk_size=self.batch_size):
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    self._insert(cursor, self._rows(batch))
+                    count += len(batch)
+                    batch = []
+            self._insert(cursor, self._rows(batch))
+            count += len(batch)
+        return count
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Generated ``search_vector`` tsvector column with a GIN index.
+
+    PostgreSQL computes the column itself with its Spanish configuration,
+    so there is nothing to keep in sync or rebuild.
+    """
+    ranked = True
+    column = 'search_vector'
+
+    def search(self, tasks, query):
+        # The spanish configuration keeps accents, so only lowercase the words
+        terms = [word.lower() for word in _WORD.findall(query)]
+        if not terms:
+            return tasks.none()
+        # Prefix match on every word, as on SQLite
+        ts_query = "to_tsquery('spanish', %s)"
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        column = f'{Task._meta.db_table}.{self.column}'
+        return tasks.extra(
+            where=[f'{column} @@ {ts_query}'],
+            params=[expression],
+            select={'search_rank': f'ts_rank({column}, {ts_query})'},
+            select_params=[expression],
+        ).order_by('-search_rank', '-pk')
+
+    def suggest(self, boards, query, limit=10):
+        # <% is pg_trgm's word similarity operator, served by the title's
+        # trigram index (see migration 0014)
+        query = ' '.join(query.split())
+        if not query:
+            return []
+        title = f'{Task._meta.db_table}.title'
+        return list(Task.objects.filter(task_list__board__in=[pk for pk, _ in boards]).extra(
+            where=[f'%s <%% {title}'],
+            params=[query],
+            select={'similarity': f'word_similarity(%s, {title})'},
+            select_params=[query],
+        ).order_by('-similarity', '-pk').values_list('pk', flat=True)[:limit])
+
+
+BACKENDS = {
+    'sqlite': 'boards.search.SQLiteSearchBackend',
+    'postgresql': 'boards.search.PostgresSearchBackend',
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """The SEARCH_BACKEND setting, or the backend matching the database"""
+    path = getattr(settings, 'SEARCH_BACKEND', None) or BACKENDS.get(connection.vendor)
+    return import_string(path)() if path else SearchBackend()
+
+
+def user_boards(user):
+    """(id, version) of every board the user owns or is a member of"""
+    return list(Board.objects.filter(
+        Q(owner=user) | Q(pk__in=member_board_ids(user))
+    ).order_by('pk').values_list('pk', 'version'))
+
+
+def boards_fingerprint(user):
+    """Return (digest, board ids) for the ids and versions of the user's boards.
+
+    Any write to one of those boards bumps its version, and gaining or
+    losing a board changes the set, so cached results keyed on this can
+    never be stale.
+    """
+    boards = user_boards(user)
+    versions = ','.join(f'{pk}:{version}' for pk, version in boards)
+    return hashlib.md5(versions.encode()).hexdigest(), [pk for pk, _ in boards]
+
+
+GENERATION_KEY = 'search:generation'
+
+
+def clear_search_cache():
+    """Retire every cached result, e.g. after the index was rebuilt"""
+    cache.set(GENERATION_KEY, cache.get(GENERATION_KEY, 0) + 1, None)
+    with _title_indexes_lock:
+        _title_indexes.clear()
+
+
+STATUS_CHOICES = [
+    ('open', 'Pendientes'),
+    ('done', 'Completadas'),
+    ('overdue', 'Vencidas'),
+]
+
+
+def search_filters(params):
+    """Pick the valid facet filters out of request parameters"""
+    filters = {}
+    if params.get('priority') in dict(Task.PRIORITY_CHOICES):
+        filters['priority'] = params['priority']
+    if params.get('status') in dict(STATUS_CHOICES):
+        filters['status'] = params['status']
+    if params.get('label'):
+        filters['label'] = Label.normalize(params['label'])
+    if params.get('assignee') == 'none' or str(params.get('assignee', '')).isdigit():
+        filters['assignee'] = params['assignee']
+    if str(params.get('list', '')).isdigit():
+        filters['list'] = params['list']
+    return filters
+
+
+def apply_filters(tasks, filters, today):
+    if 'priority' in filters:
+        tasks = tasks.filter(priority=filters['priority'])
+    if 'label' in filters:
+        # Not a join: count_facets() groups over the task's own label rows,
+        # which a join filtered down to this label would hide
+        tasks = tasks.filter(Exists(TaskLabel.objects.filter(task=OuterRef('pk'), label__normalized=filters['label'])))
+    if filters.get('assignee') == 'none':
+        tasks = tasks.filter(assigned_to__isnull=True)
+    elif 'assignee' in filters:
+        tasks = tasks.filter(assigned_to_id=filters['assignee'])
+    if 'list' in filters:
+        tasks = tasks.filter(task_list_id=filters['list'])
+    if filters.get('status') == 'open':
+        tasks = tasks.filter(completed=False)
+    elif filters.get('status') == 'done':
+        tasks = tasks.filter(completed=True)
+    elif filters.get('status') == 'overdue':
+        tasks = tasks.filter(completed=False, due_date__lt=today)
+    return tasks
+
+
+def _ranked(facet):
+    return sorted(facet.values(), key=lambda entry: (-entry['count'], entry['label'].lower()))
+
+
+def count_facets(tasks, today):
+    """Count the matches by priority, status, label, assignee and list in one query.
+
+    The tasks are grouped together with their label rows. Every task has
+    exactly one row with no label or its first label (position 0), so
+    counting those gives per-task counts; counting every row gives the
+    per-label ones.
+    """
+    is_overdue = Case(When(completed=False, due_date__lt=today, then=Value(True)),
+                      default=Value(False), output_field=BooleanField())
+    first_row = Q(task_labels__isnull=True) | Q(task_labels__position=0)
+    groups = tasks.order_by().annotate(is_overdue=is_overdue).values(
+        'priority', 'completed', 'is_overdue', 'task_list_id', 'task_list__name', 'task_list__board__name',
+        'assigned_to_id', 'assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name',
+        'task_labels__label__normalized', 'task_labels__label__name',
+    ).annotate(tasks=Count('pk', filter=first_row), rows=Count('pk'))
+
+    priorities = dict(Task.PRIORITY_CHOICES)
+    statuses = dict(STATUS_CHOICES)
+    facets = {'priority': {}, 'status': {}, 'label': {}, 'assignee': {}, 'list': {}}
+
+    def add(facet, value, label, count):
+        if count:
+            entry = facets[facet].setdefault(value, {'value': value, 'label': label, 'count': 0})
+            entry['count'] += count
+
+    for group in groups:
+        count = group['tasks']
+        add('priority', group['priority'], priorities.get(group['priority'], group['priority']), count)
+        add('status', 'done' if group['completed'] else 'open',
+            statuses['done' if group['completed'] else 'open'], count)
+        if group['is_overdue']:
+            add('status', 'overdue', statuses['overdue'], count)
+        if group['assigned_to_id']:
+            name = f"{group['assigned_to__first_name']} {group['assigned_to__last_name']}".strip()
+            add('assignee', str(group['assigned_to_id']), name or group['assigned_to__username'], count)
+        else:
+            add('assignee', 'none', 'Sin asignar', count)
+        add('list', str(group['task_list_id']),
+            f"{group['task_list__board__name']} › {group['task_list__name']}", count)
+        if group['task_labels__label__normalized']:
+            add('label', group['task_labels__label__normalized'], group['task_labels__label__name'], group['rows'])
+
+    # Priorities and statuses keep their natural order
+    return {
+        'priority': [facets['priority'][key] for key in priorities if key in facets['priority']],
+        'status': [facets['status'][key] for key in statuses if key in facets['status']],
+        'label': _ranked(facets['label']),
+        'assignee': _ranked(facets['assignee']),
+        'list': _ranked(facets['list']),
+    }
+
+
+def run_search(user, query, filters=None):
+    """Search the user's tasks and return {'ids', 'capped', 'facets'}.
+
+    ``ids`` are the matching task ids, best first, cut to
+    SEARCH_RESULT_LIMIT (``capped`` tells whether there were more);
+    ``facets`` counts every match by facet value (see count_facets). The
+    result is cached per boards fingerprint, normalized query, filters and
+    day (overdue flags change at midnight), so paging through results, or
+    another user with the same boards running the same search, costs one
+    cheap version query.
+    """
+    backend = get_search_backend()
+    filters = filters or {}
+    limit = getattr(settings, 'SEARCH_RESULT_LIMIT', 1000)
+    today = timezone.now().date()
+    fingerprint, board_ids = boards_fingerprint(user)
+    search = '|'.join([str(limit), today.isoformat(), backend.normalize(query)] + [
+        f'{name}={value}' for name, value in sorted(filters.items())
+    ])
+    key = 'search:{}:{}:{}:{}'.format(
+        cache.get(GENERATION_KEY, 0), type(backend).__name__, fingerprint, hashlib.md5(search.encode()).hexdigest(),
+    )
+    result = cache.get(key)
+    if result is None:
+        tasks = apply_filters(backend.search(Task.objects.filter(task_list__board__in=board_ids), query),
+                              filters, today)
+        ids = list(tasks.values_list('pk', flat=True)[:limit + 1])
+        result = {
+            'ids': ids[:limit],
+            'capped': len(ids) > limit,
+            'facets': count_facets(tasks, today) if ids else {},
+        }
+        cache.set(key, result, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 5 * 60))
+    return result
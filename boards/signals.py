@@ -1,14 +1,19 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Task, Board, TaskList
+from django.db.models import F, Q, Subquery
+from .access import invalidate_member_boards
+from .notifications import queue_email
+from .search import get_search_backend
+from .models import (
+    COUNTER_FIELDS, DEFAULT_BOARD_LISTS, Task, Board, TaskList, TaskComment, Label, TaskLabel,
+    NotificationPreference, DigestItem, bulk_tasks_created, populate_board, split_labels, sync_task_labels,
+)
 
 
 @receiver(post_save, sender=Task)
 def send_task_notification(sender, instance, created, **kwargs):
-    """Send email notification when a task is created or assigned"""
+    """Queue an email notification when a task is created or assigned"""
     if instance.assigned_to and instance.assigned_to.email:
         if created:
             subject = f'Nueva tarea asignada: {instance.title}'
@@ -32,12 +37,12 @@ Saludos,
 Equipo Trello Clone
             '''
         else:
-            # Check if assignment changed
-            try:
-                old_instance = Task.objects.get(pk=instance.pk)
-                if old_instance.assigned_to != instance.assigned_to:
-                    subject = f'Tarea reasignada: {instance.title}'
-                    message = f'''
+            # The stored row already holds the new assignee here, so compare
+            # with the value the task was loaded with
+            if 'assigned_to' not in instance.changed_fields:
+                return  # No assignment change, don't send email
+            subject = f'Tarea reasignada: {instance.title}'
+            message = f'''
 Hola {instance.assigned_to.first_name or instance.assigned_to.username},
 
 Se te ha reasignado una tarea:
@@ -55,52 +60,263 @@ Puedes ver la tarea en el tablero para más detalles.
 
 Saludos,
 Equipo Trello Clone
-                    '''
-                else:
-                    return  # No assignment change, don't send email
-            except Task.DoesNotExist:
-                return
-
-        try:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [instance.assigned_to.email],
-                fail_silently=True,
-            )
-        except Exception as e:
-            print(f"Error sending email: {e}")
+            '''
+
+        if NotificationPreference.wants_digest(instance.assigned_to_id):
+            # Listed in the assignee's next summary email; see flush_digests()
+            DigestItem.objects.create(recipient=instance.assigned_to, task=instance, reassigned=not created)
+            return
+
+        # Delivered by the send_notifications worker once this transaction commits
+        queue_email(instance.assigned_to.email, subject, message)
+
+
+@receiver(post_save, sender=Task)
+def sync_labels(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the board-scoped Label rows in step with the labels field"""
+    if update_fields is not None and 'labels' not in update_fields:
+        return
+    wanted = list(dict.fromkeys(Label.normalize(name) for name in split_labels(instance.labels)))
+    if created:
+        if wanted:
+            sync_task_labels([instance])
+        return
+    current = list(TaskLabel.objects.filter(task=instance).order_by('position').values_list(
+        'label__normalized', flat=True
+    ))
+    if current != wanted:
+        sync_task_labels([instance])
 
 
 @receiver(post_save, sender=Board)
 def create_default_lists(sender, instance, created, **kwargs):
-    """Create default task lists when a new board is created"""
+    """Create the lists of a new board, from its template or the defaults"""
     if created:
-        default_lists = [
-            'Por hacer',
-            'En progreso',
-            'Terminado'
-        ]
-        
-        for i, list_name in enumerate(default_lists):
-            TaskList.objects.create(
-                name=list_name,
-                board=instance,
-                position=i
-            )
+        # `template` is set by the board form; it is not a model field
+        template = getattr(instance, 'template', None)
+        populate_board(instance, template.lists if template else DEFAULT_BOARD_LISTS)
 
 
 @receiver(pre_save, sender=Task)
 def set_task_position(sender, instance, **kwargs):
     """Set task position if not provided"""
-    if not instance.position and instance.task_list:
-        instance.position = instance.task_list.get_next_position()
+    if instance.position is None and instance.task_list_id:
+        instance.position = TaskList.allocate_positions(instance.task_list_id)[0]
 
 
 @receiver(pre_save, sender=TaskList)
 def set_list_position(sender, instance, **kwargs):
     """Set list position if not provided"""
-    if not instance.position and instance.board:
+    if instance.position is None and instance.board:
         last_list = TaskList.objects.filter(board=instance.board).order_by('-position').first()
         instance.position = (last_list.position + 1) if last_list else 0
+
+
+def _deleted_by_cascade(instance, origin):
+    """True when the row goes away because its board, list or task was deleted.
+
+    The object being deleted bumps the board version itself, so the rows
+    collected by the cascade do not need to issue one UPDATE each.
+    """
+    return isinstance(origin, (Board, TaskList, Task)) and origin is not instance
+
+
+@receiver(post_save, sender=Board)
+def bump_board_version_on_save(sender, instance, created, **kwargs):
+    """Invalidate the cached snapshot when the board itself changes"""
+    if not created:
+        Board.bump_version(pk=instance.pk)
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def bump_board_version_on_members_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate the cached snapshot when board membership changes"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Board.bump_version(pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        Board.bump_version(pk__in=pk_set)
+    elif action == 'pre_clear':
+        Board.bump_version(members=instance)
+
+
+@receiver(post_save, sender=TaskList)
+@receiver(post_delete, sender=TaskList)
+def bump_board_version_on_list_change(sender, instance, origin=None, **kwargs):
+    """Invalidate the cached snapshot when a list is added, renamed or removed"""
+    if not _deleted_by_cascade(instance, origin):
+        Board.bump_version(pk=instance.board_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_board_version_on_task_change(sender, instance, origin=None, **kwargs):
+    """Invalidate the cached snapshot when a task changes"""
+    if not _deleted_by_cascade(instance, origin):
+        Board.bump_version(lists=instance.task_list_id)
+
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def bump_board_version_on_comment_change(sender, instance, origin=None, **kwargs):
+    """Invalidate the cached snapshot when a comment is added or removed"""
+    if not _deleted_by_cascade(instance, origin):
+        Board.bump_version(lists__tasks=instance.task_id)
+
+
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+def bump_board_version_on_label_change(sender, instance, origin=None, **kwargs):
+    """Invalidate the cached snapshot when a label is renamed or removed"""
+    if not _deleted_by_cascade(instance, origin):
+        Board.bump_version(pk=instance.board_id)
+
+
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_display_name_change(sender, instance, update_fields=None, **kwargs):
+    """Note whether the name shown on cards and comments is about to change"""
+    instance._display_name_changed = False
+    if instance._state.adding or (update_fields is not None and not set(DISPLAYED_USER_FIELDS) & set(update_fields)):
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list(*DISPLAYED_USER_FIELDS).first()
+    instance._display_name_changed = stored != tuple(getattr(instance, field) for field in DISPLAYED_USER_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def bump_board_version_on_user_rename(sender, instance, **kwargs):
+    """Invalidate the cached pages of the boards showing a renamed user"""
+    if getattr(instance, '_display_name_changed', False):
+        Board.bump_version(pk__in=Board.objects.filter(
+            Q(lists__tasks__assigned_to=instance) | Q(lists__tasks__comments__author=instance)
+        ).values('pk'))
+
+
+COUNTED_FIELDS = ('task_list_id', 'completed', 'due_date')
+
+
+@receiver(pre_save, sender=Task)
+def remember_counted_state(sender, instance, **kwargs):
+    """Capture the stored state the list and board counters were computed from"""
+    instance._counted_state = None
+    if instance._state.adding:
+        return
+    loaded = instance.loaded_values or {}
+    if all(field in loaded for field in COUNTED_FIELDS):
+        instance._counted_state = {field: loaded[field] for field in COUNTED_FIELDS}
+    else:
+        # Built by hand or loaded with deferred fields: ask the database
+        instance._counted_state = Task.objects.filter(pk=instance.pk).values(*COUNTED_FIELDS).first()
+
+
+@receiver(post_save, sender=Task)
+def update_counters_on_task_save(sender, instance, created, **kwargs):
+    """Apply the change in the task's contribution to its list and board counters"""
+    old = getattr(instance, '_counted_state', None)
+    if old is None:
+        TaskList.adjust_counters(instance.task_list_id, Task.counter_values(
+            instance.completed, instance.due_date, instance.comment_count
+        ))
+        return
+    if old['task_list_id'] != instance.task_list_id:
+        # The comment count moves with the task; read it from the row, which
+        # ordinary saves never write
+        comment_count = Subquery(Task.objects.filter(pk=instance.pk).values('comment_count'))
+        before = Task.counter_values(old['completed'], old['due_date'], comment_count)
+        after = Task.counter_values(instance.completed, instance.due_date, comment_count)
+        TaskList.adjust_counters(old['task_list_id'], {field: -value for field, value in before.items()})
+        TaskList.adjust_counters(instance.task_list_id, after)
+    else:
+        before = Task.counter_values(old['completed'], old['due_date'], 0)
+        after = Task.counter_values(instance.completed, instance.due_date, 0)
+        TaskList.adjust_counters(instance.task_list_id, {
+            field: after[field] - before[field] for field in after
+        })
+
+
+@receiver(post_delete, sender=Task)
+def update_counters_on_task_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted task from its list and board counters"""
+    if not _deleted_by_cascade(instance, origin):
+        values = Task.counter_values(instance.completed, instance.due_date, instance.comment_count)
+        TaskList.adjust_counters(instance.task_list_id, {field: -value for field, value in values.items()})
+
+
+@receiver(pre_delete, sender=TaskList)
+def update_counters_on_list_delete(sender, instance, origin=None, **kwargs):
+    """Remove a list's tasks from the board counters before the list goes away"""
+    if not _deleted_by_cascade(instance, origin):
+        # Read the counters in the UPDATE itself: the instance may be stale
+        stored = TaskList.objects.filter(pk=instance.pk)
+        Board.objects.filter(pk=instance.board_id).update(**{
+            field: F(field) - Subquery(stored.values(field)) for field in COUNTER_FIELDS
+        })
+
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def update_comment_counters(sender, instance, created=False, origin=None, **kwargs):
+    """Count a comment on its task, list and board"""
+    if kwargs['signal'] is post_save and not created:
+        return
+    if _deleted_by_cascade(instance, origin):
+        return
+    delta = 1 if created else -1
+    Task.objects.filter(pk=instance.task_id).update(comment_count=F('comment_count') + delta)
+    TaskList.objects.filter(tasks=instance.task_id).update(comment_count=F('comment_count') + delta)
+    Board.objects.filter(lists__tasks=instance.task_id).update(comment_count=F('comment_count') + delta)
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def invalidate_access_on_members_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop the cached membership sets of the users whose access changed"""
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_member_boards([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_member_boards(pk_set)
+    elif action == 'pre_clear':
+        invalidate_member_boards(instance.members.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Board)
+def invalidate_access_on_board_delete(sender, instance, **kwargs):
+    """Drop the members' cached sets so a reused board id grants nothing"""
+    invalidate_member_boards(instance.members.values_list('pk', flat=True))
+
+
+SEARCHED_FIELDS = ('title', 'description', 'labels')
+
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, created, update_fields=None, **kwargs):
+    """Reindex a task whose searchable text may have changed (see search.py)"""
+    if created or update_fields is None or set(SEARCHED_FIELDS) & set(update_fields):
+        get_search_backend().index([instance])
+
+
+@receiver(bulk_tasks_created, sender=Task)
+def index_bulk_created_tasks(sender, tasks, **kwargs):
+    """Index tasks inserted with bulk_create(), which sends no post_save"""
+    get_search_backend().index(tasks)
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_from_index(sender, instance, origin=None, **kwargs):
+    """Drop a deleted task from the full-text index"""
+    if not _deleted_by_cascade(instance, origin):
+        get_search_backend().remove([instance.pk])
+
+
+@receiver(pre_delete, sender=Board)
+@receiver(pre_delete, sender=TaskList)
+def remove_tasks_from_index(sender, instance, origin=None, **kwargs):
+    """Drop the tasks of a board or list about to be deleted from the index, in one call"""
+    if _deleted_by_cascade(instance, origin):
+        return
+    tasks = Task.objects.filter(task_list__board=instance) if sender is Board else instance.tasks.all()
+    task_ids = list(tasks.values_list('pk', flat=True))
+    if task_ids:
+        get_search_backend().remove(task_ids)
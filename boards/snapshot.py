@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import Truncator
+from .models import TaskList, Task, TaskLabel, split_labels
+from .pagination import keyset_filter
+
+
+EXCERPT_WORDS = 10
+
+# Any pk works here; it only marks where the real pk goes in the reversed URL.
+_PK_PLACEHOLDER = 987654321
+
+
+def _url_builder(name):
+    """Reverse a pk-based URL once and return a cheap pk -> URL function"""
+    prefix, suffix = reverse(name, kwargs={'pk': _PK_PLACEHOLDER}).split(str(_PK_PLACEHOLDER))
+    return lambda pk: f'{prefix}{pk}{suffix}'
+
+
+def _full_name(first_name, last_name, username):
+    """Mirror User.get_full_name() falling back to the username"""
+    return f'{first_name or ""} {last_name or ""}'.strip() or username
+
+
+_CARD_FIELDS = (
+    'id', 'task_list_id', 'position', 'title', 'description', 'due_date', 'priority', 'labels',
+    'completed', 'created_at', 'assigned_to_id', 'assigned_to__first_name',
+    'assigned_to__last_name', 'assigned_to__username',
+)
+
+
+def _load_labels(rows):
+    """Map task id -> label names, in one query over the label join table"""
+    labels = {}
+    task_labels = TaskLabel.objects.filter(task_id__in=[row[0] for row in rows]).order_by('task_id', 'position')
+    for task_id, name in task_labels.values_list('task_id', 'label__name'):
+        labels.setdefault(task_id, []).append(name)
+    return labels
+
+
+def _card_builder(label_names):
+    """Return a function turning a row of _CARD_FIELDS into a card dict.
+
+    Everything the card template needs (labels, overdue flag, excerpt, URLs,
+    display values) is computed here so rendering never touches the database
+    or the URL resolver.
+    """
+    today = timezone.now().date()
+    priority_display = dict(Task.PRIORITY_CHOICES)
+    detail_url = _url_builder('task_detail')
+    edit_url = _url_builder('task_edit')
+    delete_url = _url_builder('task_delete')
+
+    def build(row):
+        (task_id, list_id, position, title, description, due_date, priority, labels, completed,
+         created_at, assigned_to_id, first_name, last_name, username) = row
+        return {
+            'id': task_id,
+            'task_list_id': list_id,
+            'position': position,
+            'title': title,
+            'excerpt': Truncator(description).words(EXCERPT_WORDS) if description else '',
+            'due_date': due_date,
+            'is_overdue': bool(due_date and due_date < today and not completed),
+            'priority': priority,
+            'priority_display': priority_display.get(priority, priority),
+            'priority_color': Task.PRIORITY_COLORS.get(priority, 'secondary'),
+            # Rows written in bulk without the label sync fall back to the text field
+            'labels_list': label_names[task_id] if task_id in label_names else split_labels(labels),
+            'completed': completed,
+            'created_at': created_at,
+            'assigned_to_id': assigned_to_id,
+            'assigned_to_name': _full_name(first_name, last_name, username) if assigned_to_id else '',
+            'detail_url': detail_url(task_id),
+            'edit_url': edit_url(task_id),
+            'delete_url': delete_url(task_id),
+        }
+
+    return build
+
+
+def encode_cursor(card):
+    """Cursor pointing just after the given card"""
+    return f'{card["position"]}:{card["id"]}'
+
+
+def decode_cursor(cursor):
+    """Return the (position, id) pair of a cursor, raising ValueError if malformed"""
+    position, task_id = cursor.split(':')
+    return int(position), int(task_id)
+
+
+def _page(cards, limit):
+    """Trim a list fetched with limit + 1 rows into a page dict"""
+    has_more = len(cards) > limit
+    cards = cards[:limit]
+    return {
+        'tasks': cards,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(cards[-1]) if has_more else None,
+    }
+
+
+def load_board_snapshot(board, page_size=None):
+    """Build the board as plain dicts in a fixed number of queries.
+
+    One query loads the lists, one the first ``page_size`` cards of every
+    list with their assignees and one their labels, whatever the size of the
+    board. Lists that hold more cards carry a cursor for load_list_page().
+    """
+    page_size = page_size or getattr(settings, 'BOARD_LIST_PAGE_SIZE', 50)
+
+    lists = []
+    cards_by_list = {}
+    list_rows = TaskList.objects.filter(board=board).values_list('id', 'name', 'position', 'task_count')
+    for list_id, name, position, task_count in list_rows:
+        lists.append({'id': list_id, 'name': name, 'position': position, 'task_count': task_count})
+        cards_by_list[list_id] = []
+
+    # Fetch one extra card per list to know whether there is a next page
+    rows = Task.objects.filter(task_list__board=board).annotate(
+        row_number=Window(RowNumber(), partition_by=F('task_list_id'), order_by=[F('position'), F('id')])
+    ).filter(row_number__lte=page_size + 1).order_by('task_list_id', 'position', 'id').values_list(*_CARD_FIELDS)
+    rows = list(rows)
+    build = _card_builder(_load_labels(rows))
+    for row in rows:
+        cards_by_list[row[1]].append(build(row))
+
+    for task_list in lists:
+        task_list.update(_page(cards_by_list[task_list['id']], page_size))
+
+    return {
+        'id': board.pk,
+        'name': board.name,
+        'description': board.description,
+        'lists': lists,
+    }
+
+
+def load_list_page(task_list, cursor=None, limit=None):
+    """Return the cards of a list following ``cursor`` (plus one query for labels).
+
+    The cursor names the last card the client holds. While that card is
+    still in the list its current position is used, so cards shifted by a
+    move since the previous page are neither skipped nor repeated.
+    """
+    limit = limit or getattr(settings, 'BOARD_LIST_PAGE_SIZE', 50)
+    tasks = Task.objects.filter(task_list=task_list)
+    if cursor:
+        position, task_id = decode_cursor(cursor)
+        anchor = Task.objects.filter(pk=task_id, task_list=task_list).values('position')
+        tasks = tasks.annotate(
+            anchor=Coalesce(Subquery(anchor), Value(position))
+        ).filter(keyset_filter(['position', 'id'], [F('anchor'), task_id]))
+    rows = list(tasks.order_by('position', 'id').values_list(*_CARD_FIELDS)[:limit + 1])
+    build = _card_builder(_load_labels(rows))
+    return _page([build(row) for row in rows], limit)
+
+
+def snapshot_cache_key(board, today=None):
+    """Cache key of the board snapshot for the board's current version.
+
+    Overdue flags depend on the date, so the key rolls over every day too.
+    """
+    today = today or timezone.now().date()
+    return f'board-snapshot:{board.pk}:{board.version}:{today.isoformat()}'
+
+
+def get_board_snapshot(board):
+    """Return the board snapshot, from the cache while the board is unchanged.
+
+    Any write to the board, its lists, tasks or comments bumps
+    Board.version (see signals.py), which moves the snapshot to a new key.
+    """
+    key = snapshot_cache_key(board)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = load_board_snapshot(board)
+        cache.set(key, snapshot, getattr(settings, 'BOARD_SNAPSHOT_CACHE_TIMEOUT', 60 * 60))
+    return snapshot
@@ -1,7 +1,42 @@
-from django.test import TestCase, Client
+import csv
+import gzip
+import io
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
 from django.urls import reverse
-from .models import Board, TaskList, Task
+from django.utils import timezone
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from .models import (
+    Board, BoardTemplate, TaskList, Task, TaskComment, Label, OutgoingEmail, NotificationPreference, DigestItem, ExportJob,
+    MembershipVersion,
+    rebuild_counters,
+)
+from .export import stream_board_csv, stream_board_json, claim_export_job, run_export_job, ExportJobLost
+from .importer import BoardImportError, JsonStream, import_board
+from .notifications import send_due_emails, flush_digests
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor, paginate_ranked_ids
+from .search import clear_search_cache, get_search_backend, highlight, stem, trigrams
+from .access import has_board_access, member_board_ids, member_cache_key
+from .snapshot import load_board_snapshot, get_board_snapshot, load_list_page
 
 
 class BoardModelTest(TestCase):
@@ -228,10 +263,1612 @@ class ExportTest(TestCase):
         response = self.client.get(reverse('export_board_csv', kwargs={'pk': self.board.pk}))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'text/csv')
-        self.assertIn('Test Task', response.content.decode())
+        self.assertIn('Test Task', b''.join(response.streaming_content).decode())
+
+    def test_csv_export_matches_board_order(self):
+        other = User.objects.create_user(username='other', first_name='Ana', last_name='García')
+        Task.objects.create(title='Second', task_list=self.task_list, assigned_to=other, due_date=date(2030, 1, 2))
+        Task.objects.create(title='Elsewhere', task_list=self.board.lists.last(), completed=True)
+        rows = list(csv.reader(io.StringIO(''.join(stream_board_csv(self.board)))))
+        self.assertEqual(rows[0][:2], ['Lista', 'Tarea'])
+        self.assertEqual([row[1] for row in rows[1:]], ['Test Task', 'Second', 'Elsewhere'])
+        self.assertEqual(rows[2], ['Por hacer', 'Second', '', '2030-01-02', 'Media', 'Ana García', '', 'No'])
+        self.assertEqual(rows[3][-1], 'Sí')
+
+    def test_csv_export_memory_stays_flat(self):
+        def peak_while_streaming(count):
+            board = Board.objects.create(name=f'{count} tasks', owner=self.user)
+            Task.objects.bulk_create([
+                Task(title=f'Task {i}', description='word ' * 30, task_list=board.lists.first(), position=i)
+                for i in range(count)
+            ], batch_size=1000)
+            size = 0
+            tracemalloc.start()
+            for chunk in stream_board_csv(board):
+                size += len(chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak, size
+
+        small_peak, _ = peak_while_streaming(2500)
+        large_peak, large_size = peak_while_streaming(10000)
+        # Four times the rows, about the same peak: it depends on the chunk
+        # size, not on the board
+        self.assertLess(large_peak, small_peak * 1.3)
+        self.assertLess(large_peak, large_size)
 
     def test_json_export(self):
         self.client.login(username='testuser', password='testpass123')
         response = self.client.get(reverse('export_board_json', kwargs={'pk': self.board.pk}))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_json_export_matches_whole_document_dump(self):
+        other = User.objects.create_user(username='other', first_name='Ana', last_name='García')
+        Task.objects.create(title='Ünïcode "quoted"', task_list=self.task_list, labels='api, Rápido',
+                            assigned_to=other, due_date=date(2030, 1, 2))
+        TaskComment.objects.create(task=self.task, author=other, content='Primero')
+        TaskComment.objects.create(task=self.task, author=self.user, content='Segundo')
+        expected = {
+            'board': {
+                'name': self.board.name,
+                'description': self.board.description,
+                'created_at': self.board.created_at.isoformat(),
+            },
+            'lists': [
+                {
+                    'name': task_list.name,
+                    'position': task_list.position,
+                    'tasks': [
+                        {
+                            'title': task.title,
+                            'description': task.description,
+                            'due_date': task.due_date.isoformat() if task.due_date else None,
+                            'priority': task.get_priority_display(),
+                            'labels': task.labels_list,
+                            'assigned_to': task.assigned_to.get_full_name() if task.assigned_to else None,
+                            'assigned_to_username': task.assigned_to.username if task.assigned_to else None,
+                            'completed': task.completed,
+                            'created_at': task.created_at.isoformat(),
+                        }
+                        for task in task_list.tasks.order_by('position', 'id')
+                    ],
+                }
+                for task_list in self.board.lists.order_by('position', 'id')
+            ],
+        }
+        self.assertEqual(''.join(stream_board_json(self.board)), json.dumps(expected, indent=2))
+
+        document = json.loads(''.join(stream_board_json(self.board, include_comments=True)))
+        comments = document['lists'][0]['tasks'][0]['comments']
+        self.assertEqual([(c['author'], c['content']) for c in comments], [('Ana García', 'Primero'), ('testuser', 'Segundo')])
+        self.assertEqual(document['lists'][0]['tasks'][1]['comments'], [])
+
+
+class BoardSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.lists = [
+            TaskList.objects.create(name=f'List {i}', board=self.board, position=i)
+            for i in range(3)
+        ]
+
+    def create_tasks(self, count):
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task {i}',
+                description='word ' * 20,
+                task_list=self.lists[i % len(self.lists)],
+                position=i,
+                labels='urgent, backend',
+                assigned_to=self.user if i % 2 else None,
+                due_date=date.today() - timedelta(days=1),
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        # bulk_create skips the signals that keep the counters
+        rebuild_counters()
+
+    def test_query_count_does_not_grow_with_board_size(self):
+        for count in (10, 1000, 10000):
+            Task.objects.all().delete()
+            self.create_tasks(count)
+            with self.assertNumQueries(3):
+                snapshot = load_board_snapshot(self.board, page_size=50)
+            lists = {lst['id']: lst for lst in snapshot['lists']}
+            for i, task_list in enumerate(self.lists):
+                in_list = len(range(i, count, len(self.lists)))
+                self.assertEqual(len(lists[task_list.pk]['tasks']), min(50, in_list))
+                self.assertEqual(lists[task_list.pk]['has_more'], in_list > 50)
+
+    def test_cards_are_precomputed(self):
+        self.create_tasks(2)
+        cards = [task for lst in load_board_snapshot(self.board)['lists'] for task in lst['tasks']]
+        card = next(task for task in cards if task['title'] == 'Task 1')
+        self.assertEqual(card['labels_list'], ['urgent', 'backend'])
+        self.assertTrue(card['is_overdue'])
+        self.assertEqual(card['assigned_to_name'], 'Test User')
+        self.assertEqual(card['priority_display'], 'Media')
+        self.assertEqual(card['detail_url'], reverse('task_detail', kwargs={'pk': card['id']}))
+        self.assertEqual(len(card['excerpt'].split()), 10)
+        self.assertTrue(card['excerpt'].endswith('…'))
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_board_detail_renders_snapshot(self):
+        self.create_tasks(30)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('board_detail', kwargs={'pk': self.board.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Task 29')
+        self.assertContains(response, 'Test User')
+
+    @override_settings(
+        STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+        BOARD_LIST_PAGE_SIZE=5,
+    )
+    def test_board_detail_renders_first_page_of_each_list(self):
+        self.create_tasks(30)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('board_detail', kwargs={'pk': self.board.pk}))
+        self.assertEqual(len(set(re.findall(r'data-task-id="(\d+)"', response.content.decode()))), 15)
+        self.assertContains(response, 'load-more-tasks', count=3 + 1)  # 3 markers and the CSS rule
+
+
+class BoardSnapshotCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(username='other')
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.task_list = self.board.lists.first()
+        self.task = Task.objects.create(
+            title='Test Task',
+            task_list=self.task_list
+        )
+
+    def fresh_board(self):
+        return Board.objects.get(pk=self.board.pk)
+
+    def assertInvalidates(self, change):
+        board = self.fresh_board()
+        get_board_snapshot(board)
+        change()
+        self.assertGreater(self.fresh_board().version, board.version)
+
+    def test_unchanged_board_is_served_from_cache(self):
+        board = self.fresh_board()
+        get_board_snapshot(board)
+        with self.assertNumQueries(0):
+            snapshot = get_board_snapshot(board)
+        self.assertEqual(snapshot['lists'][0]['tasks'][0]['title'], 'Test Task')
+
+    def test_task_changes_invalidate(self):
+        def rename():
+            self.task.title = 'Renamed'
+            self.task.save()
+        self.assertInvalidates(rename)
+        tasks = get_board_snapshot(self.fresh_board())['lists'][0]['tasks']
+        self.assertEqual(tasks[0]['title'], 'Renamed')
+        self.assertInvalidates(lambda: Task.objects.create(title='New', task_list=self.task_list))
+        self.assertInvalidates(self.task.delete)
+
+    def test_list_comment_and_board_changes_invalidate(self):
+        def rename_list():
+            self.task_list.name = 'Renamed'
+            self.task_list.save()
+        self.assertInvalidates(rename_list)
+        self.assertInvalidates(
+            lambda: TaskComment.objects.create(task=self.task, author=self.user, content='Hola')
+        )
+        self.assertInvalidates(lambda: self.board.members.add(self.other))
+        self.assertInvalidates(lambda: self.other.boards.remove(self.board))
+
+        def rename_board():
+            board = self.fresh_board()
+            board.name = 'Renamed'
+            board.save()
+        self.assertInvalidates(rename_board)
+
+    def test_user_renames_and_label_edits_invalidate(self):
+        self.task.assigned_to = self.other
+        self.task.labels = 'api'
+        self.task.save()
+
+        def rename_user():
+            self.other.first_name = 'Otra'
+            self.other.save()
+        self.assertInvalidates(rename_user)
+        self.assertEqual(get_board_snapshot(self.fresh_board())['lists'][0]['tasks'][0]['assigned_to_name'], 'Otra')
+
+        def rename_label():
+            label = Label.objects.get(board=self.board)
+            label.name = 'API'
+            label.save()
+        self.assertInvalidates(rename_label)
+        self.assertEqual(get_board_snapshot(self.fresh_board())['lists'][0]['tasks'][0]['labels_list'], ['API'])
+
+        # Logging in saves last_login only, which no card shows
+        version = self.fresh_board().version
+        self.client.force_login(self.other)
+        self.other.save()
+        self.assertEqual(self.fresh_board().version, version)
+
+    def test_stale_instance_does_not_roll_back_version(self):
+        stale = self.fresh_board()
+        Task.objects.create(title='New', task_list=self.task_list)
+        version = self.fresh_board().version
+        stale.save()
+        self.assertGreater(self.fresh_board().version, version)
+
+    def test_json_export_reflects_changes(self):
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('export_board_json', kwargs={'pk': self.board.pk})
+        self.assertContains(self.client.get(url), 'Test Task')
+        self.task.title = 'Renamed'
+        self.task.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Renamed')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.task = Task.objects.create(
+            title='Test Task',
+            task_list=self.board.lists.first()
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.urls = [
+            reverse('board_detail', kwargs={'pk': self.board.pk}),
+            reverse('task_detail', kwargs={'pk': self.task.pk}),
+            reverse('export_board_csv', kwargs={'pk': self.board.pk}),
+            reverse('export_board_json', kwargs={'pk': self.board.pk}),
+        ]
+
+    def test_matching_etag_returns_304(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+
+    def test_not_modified_since_returns_304(self):
+        for url in self.urls:
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_304_does_not_query_tasks(self):
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        # session, user and board
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_login_changes_etag(self):
+        # Pages embed the CSRF token, which a new login rotates
+        for url in self.urls[:2]:
+            etag = self.client.get(url)['ETag']
+            self.client.logout()
+            self.client.login(username='testuser', password='testpass123')
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_write_changes_etag(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.task.title = 'Renamed'
+        self.task.save()
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertContains(response, 'Renamed')
+
+
+class TaskListPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.task_list = self.board.lists.first()
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', task_list=self.task_list, position=i)
+            for i in range(120)
+        ])
+        rebuild_counters()
+        self.ids = list(Task.objects.filter(task_list=self.task_list).order_by('position').values_list('id', flat=True))
+
+    def collect(self, limit, on_page=None):
+        seen, cursor = [], None
+        while True:
+            page = load_list_page(self.task_list, cursor=cursor, limit=limit)
+            seen += [task['id'] for task in page['tasks']]
+            if not page['has_more']:
+                return seen
+            cursor = page['next_cursor']
+            if on_page:
+                on_page()
+
+    def test_pages_cover_list_in_position_order(self):
+        with self.assertNumQueries(2):
+            load_list_page(self.task_list, limit=50)
+        self.assertEqual(self.collect(50), self.ids)
+
+    def test_shift_between_pages_does_not_skip_cards(self):
+        moved = Task.objects.get(pk=self.ids[0])
+        other = self.board.lists.exclude(pk=self.task_list.pk).first()
+
+        def move_first_card_out():
+            if moved.task_list_id == self.task_list.pk:
+                Task.objects.filter(task_list=self.task_list, position__gt=0).update(position=F('position') - 1)
+                moved.task_list = other
+                moved.save()
+
+        self.assertEqual(self.collect(50, on_page=move_first_card_out), self.ids[:50] + self.ids[50:])
+
+    def test_endpoint(self):
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('task_list_tasks', kwargs={'pk': self.task_list.pk})
+        first = self.client.get(url, {'limit': 100}).json()
+        self.assertTrue(first['has_more'])
+        self.assertEqual(first['task_ids'], self.ids[:100])
+        self.assertIn('Task 99', first['html'])
+        second = self.client.get(url, {'limit': 100, 'cursor': first['next_cursor']}).json()
+        self.assertFalse(second['has_more'])
+        self.assertEqual(second['task_ids'], self.ids[100:])
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'}).status_code, 400)
+
+    def test_endpoint_requires_access(self):
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        url = reverse('task_list_tasks', kwargs={'pk': self.task_list.pk})
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class LabelTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.task_list = self.board.lists.first()
+        self.task = Task.objects.create(
+            title='Test Task',
+            task_list=self.task_list,
+            labels='Backend, urgent, backend'
+        )
+
+    def test_labels_are_board_scoped_rows(self):
+        other = Task.objects.create(title='Other', task_list=self.task_list, labels='URGENT')
+        self.assertEqual(sorted(self.board.labels.values_list('name', flat=True)), ['Backend', 'urgent'])
+        urgent = Label.objects.get(board=self.board, normalized='urgent')
+        self.assertEqual(set(urgent.tasks.all()), {self.task, other})
+
+    def test_editing_labels_resyncs_rows(self):
+        self.task.labels = 'frontend'
+        self.task.save()
+        self.assertEqual(list(self.task.board_labels.values_list('name', flat=True)), ['frontend'])
+        self.task.labels = ''
+        self.task.save()
+        self.assertFalse(self.task.board_labels.exists())
+
+    def test_labels_list_uses_prefetched_rows_in_order(self):
+        task = Task.objects.with_labels().get(pk=self.task.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(task.labels_list, ['Backend', 'urgent'])
+
+    def test_search_matches_whole_labels(self):
+        Task.objects.create(title='Fast one', task_list=self.task_list, labels='rapid')
+        Task.objects.create(title='Interface', task_list=self.task_list, labels='API')
+        self.client.login(username='testuser', password='testpass123')
+        with override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+            response = self.client.get(reverse('search_tasks'), {'q': 'api'})
+        self.assertContains(response, 'Interface')
+        self.assertNotContains(response, 'Fast one')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buscador', password='testpass123')
+        self.board = Board.objects.create(name='Búsqueda', owner=self.user)
+        self.task_list = self.board.lists.first()
+        self.client.login(username='buscador', password='testpass123')
+
+    def search(self, query):
+        response = self.client.get(reverse('search_tasks'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [task.title for task in response.context['page_obj']]
+
+    def test_spanish_stemming(self):
+        for words in (['diseño', 'diseños', 'diseñar', 'diseñando', 'Diseno'], ['luz', 'luces'], ['tarea', 'tareas']):
+            self.assertEqual(len({stem(word) for word in words}), 1, words)
+        self.assertEqual([stem(word) for word in ('mes', 'api', 'ux')], ['mes', 'api', 'ux'])
+
+        Task.objects.create(title='Diseñar la portada', task_list=self.task_list)
+        Task.objects.create(title='Revisar presupuesto', task_list=self.task_list)
+        self.assertEqual(self.search('diseños'), ['Diseñar la portada'])
+        self.assertEqual(self.search('DISENO portada'), ['Diseñar la portada'])
+        self.assertEqual(self.search('portada presupuesto'), [])
+
+    def test_ranking_and_highlighting(self):
+        Task.objects.create(title='Notas', description='Hablar del logo en la reunión', task_list=self.task_list)
+        Task.objects.create(title='Logo nuevo', task_list=self.task_list)
+        Task.objects.create(title='Colores', labels='logo', task_list=self.task_list)
+        self.assertEqual(self.search('logo'), ['Logo nuevo', 'Colores', 'Notas'])
+
+        response = self.client.get(reverse('search_tasks'), {'q': 'logo'})
+        self.assertContains(response, '<mark>Logo</mark> nuevo', html=False)
+        self.assertContains(response, 'Hablar del <mark>logo</mark> en la reunión', html=False)
+        snippet = highlight(' '.join(['relleno'] * 50 + ['<b>logo</b>'] + ['relleno'] * 50), 'logo')
+        self.assertIn('<mark>logo</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+        self.assertTrue(snippet.startswith('… ') and snippet.endswith(' …'))
+
+    def test_index_follows_writes(self):
+        task = Task.objects.create(title='Migrar servidor', task_list=self.task_list)
+        task.title = 'Actualizar certificados'
+        task.save()
+        self.assertEqual(self.search('servidor'), [])
+        self.assertEqual(self.search('certificado'), ['Actualizar certificados'])
+        task.delete()
+        self.assertEqual(self.search('certificado'), [])
+
+        # Tasks written in bulk, by templates and imports, are indexed too
+        template = BoardTemplate.objects.create(name='Plantilla', lists=[
+            {'name': 'Inicio', 'tasks': [{'title': 'Configurar repositorio'}]},
+        ])
+        board = Board(name='Desde plantilla', owner=self.user)
+        board.template = template
+        board.save()
+        self.assertEqual(self.search('repositorios'), ['Configurar repositorio'])
+
+    def test_deleting_a_board_or_list_unindexes_its_tasks_at_once(self):
+        other_list = self.board.lists.last()
+        for i in range(3):
+            Task.objects.create(title=f'Factura {i}', task_list=self.task_list)
+            Task.objects.create(title=f'Recibo {i}', task_list=other_list)
+        with CaptureQueriesContext(connection) as queries:
+            self.task_list.delete()
+        self.assertEqual(len([q for q in queries if 'boards_task_fts' in q['sql']]), 1)
+        self.assertEqual(self.search('factura'), [])
+        with CaptureQueriesContext(connection) as queries:
+            self.board.delete()
+        self.assertEqual(len([q for q in queries if 'boards_task_fts' in q['sql']]), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM boards_task_fts')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_only_accessible_boards(self):
+        other = User.objects.create_user(username='otro')
+        hidden = Board.objects.create(name='Ajeno', owner=other)
+        Task.objects.create(title='Secreto compartido', task_list=hidden.lists.first())
+        self.assertEqual(self.search('secreto'), [])
+        hidden.members.add(self.user)
+        self.assertEqual(self.search('secreto'), ['Secreto compartido'])
+
+    def test_results_cached_until_a_board_changes(self):
+        for i in range(25):
+            Task.objects.create(title=f'Informe {i}', task_list=self.task_list)
+
+        def searches(params):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('search_tasks'), params)
+            return response, sum('MATCH' in query['sql'] for query in queries.captured_queries)
+
+        # One query for the ranked ids and one grouped query for the facets
+        response, count = searches({'q': 'informes'})
+        self.assertEqual((count, response.context['result_count']), (2, 25))
+        # Other pages and spellings of the same words reuse the cached ids
+        cursor = response.context['page_obj'].next_cursor
+        response, count = searches({'q': 'Informe', 'cursor': cursor})
+        self.assertEqual((count, len(response.context['page_obj'])), (0, 5))
+
+        Task.objects.create(title='Informe final', task_list=self.task_list)
+        response, count = searches({'q': 'informes'})
+        self.assertEqual((count, response.context['result_count']), (2, 26))
+
+    @override_settings(SEARCH_RESULT_LIMIT=3)
+    def test_counts_are_capped(self):
+        for i in range(5):
+            Task.objects.create(title=f'Informe {i}', task_list=self.task_list)
+        response = self.client.get(reverse('search_tasks'), {'q': 'informe'})
+        self.assertEqual(response.context['result_count'], 3)
+        self.assertContains(response, '3+ tarea(s) encontrada(s)')
+
+    def test_facet_counts_and_filters(self):
+        doing = self.board.lists.all()[1]
+        Task.objects.create(title='Informe anual', priority='H', labels='finanzas, urgente',
+                            assigned_to=self.user, task_list=self.task_list)
+        Task.objects.create(title='Informe mensual', priority='H', labels='finanzas',
+                            due_date=date.today() - timedelta(days=1), task_list=self.task_list)
+        Task.objects.create(title='Informe semanal', completed=True, task_list=doing)
+        Task.objects.create(title='Acta', priority='H', labels='finanzas', task_list=doing)
+
+        response = self.client.get(reverse('search_tasks'), {'q': 'informe'})
+        facets = {facet['name']: {entry['value']: entry['count'] for entry in facet['entries']}
+                  for facet in response.context['facets']}
+        self.assertEqual(facets['priority'], {'H': 2, 'M': 1})
+        self.assertEqual(facets['status'], {'open': 2, 'done': 1, 'overdue': 1})
+        self.assertEqual(facets['label'], {'finanzas': 2, 'urgente': 1})
+        self.assertEqual(facets['assignee'], {str(self.user.pk): 1, 'none': 2})
+        self.assertEqual(facets['list'], {str(self.task_list.pk): 2, str(doing.pk): 1})
+
+        self.assertEqual(self.client.get(reverse('search_tasks'), {'q': 'informe', 'label': 'Finanzas'})
+                         .context['result_count'], 2)
+        response = self.client.get(reverse('search_tasks'), {'q': 'informe', 'priority': 'H', 'status': 'overdue'})
+        self.assertEqual([task.title for task in response.context['page_obj']], ['Informe mensual'])
+        priority = response.context['facets'][1]['entries'][0]
+        self.assertTrue(priority['active'])
+        self.assertEqual(priority['url'], '?q=informe&status=overdue')
+
+    def test_facet_counts_with_a_label_filter(self):
+        Task.objects.create(title='Informe uno', labels='api', task_list=self.task_list)
+        Task.objects.create(title='Informe dos', labels='web, api', task_list=self.task_list)
+        response = self.client.get(reverse('search_tasks'), {'q': 'informe', 'label': 'api'})
+        self.assertEqual(response.context['result_count'], 2)
+        facets = {facet['name']: {entry['value']: entry['count'] for entry in facet['entries']}
+                  for facet in response.context['facets']}
+        self.assertEqual(facets['priority'], {'M': 2})
+        self.assertEqual(facets['list'], {str(self.task_list.pk): 2})
+        self.assertEqual(facets['label'], {'api': 2, 'web': 1})
+
+    def test_facets_are_cached_with_the_results(self):
+        Task.objects.create(title='Informe', labels='finanzas', task_list=self.task_list)
+        self.client.get(reverse('search_tasks'), {'q': 'informe'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search_tasks'), {'q': 'informe'})
+        self.assertFalse(any('MATCH' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(response.context['facets'][2]['entries'][0]['count'], 1)
+
+    def test_rebuild_command(self):
+        Task.objects.create(title='Reindexar todo', task_list=self.task_list)
+        backend = get_search_backend()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {backend.table}')
+        self.assertEqual(self.search('reindexar'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('1 tareas indexadas', out.getvalue())
+        self.assertEqual(self.search('reindexar'), ['Reindexar todo'])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class TypeaheadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_search_cache()
+        self.user = User.objects.create_user(username='tecleador', password='testpass123')
+        self.board = Board.objects.create(name='Producto', owner=self.user)
+        self.task_list = self.board.lists.first()
+        self.client.login(username='tecleador', password='testpass123')
+
+    def suggest(self, query):
+        response = self.client.get(reverse('suggest_tasks'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [result['title'] for result in response.json()['results']]
+
+    def test_prefixes_and_misspellings_match(self):
+        self.assertEqual(trigrams('Ño'), {'  n', ' no', 'no '})
+        Task.objects.create(title='Diseñar la portada', task_list=self.task_list)
+        Task.objects.create(title='Presupuesto anual', task_list=self.task_list)
+        self.assertEqual(self.suggest('dise'), ['Diseñar la portada'])
+        self.assertEqual(self.suggest('presupeusto'), ['Presupuesto anual'])
+        self.assertEqual(self.suggest('portda'), ['Diseñar la portada'])
+        self.assertEqual(self.suggest('zzz'), [])
+        self.assertEqual(self.suggest('p'), [])
+
+    def test_top_ten_best_first(self):
+        for i in range(12):
+            Task.objects.create(title=f'Informe {i}', task_list=self.task_list)
+        Task.objects.create(title='Infografía', task_list=self.task_list)
+        titles = self.suggest('informe')
+        self.assertEqual(len(titles), 10)
+        self.assertNotIn('Infografía', titles)
+
+    def test_index_follows_board_writes(self):
+        task = Task.objects.create(title='Migrar servidor', task_list=self.task_list)
+        self.assertEqual(self.suggest('servidor'), ['Migrar servidor'])
+        # Served from this worker's index until the board's version changes:
+        # session, user, membership version, board versions and the matched titles
+        with self.assertNumQueries(5):
+            self.suggest('servidor')
+        task.title = 'Renovar certificados'
+        task.save()
+        self.assertEqual(self.suggest('servidor'), [])
+        self.assertEqual(self.suggest('certificado'), ['Renovar certificados'])
+        task.delete()
+        self.assertEqual(self.suggest('certificado'), [])
+
+    @override_settings(SUGGEST_INDEX_BOARDS=3)
+    def test_more_boards_than_the_index_cap(self):
+        for i in range(5):
+            board = Board.objects.create(name=f'Tablero {i}', owner=self.user)
+            Task.objects.create(title=f'Informe {i}', task_list=board.lists.first())
+        self.assertEqual(len(self.suggest('informe')), 5)
+        # Every board's index survived the first request
+        with self.assertNumQueries(5):
+            self.assertEqual(len(self.suggest('informe')), 5)
+
+    def test_only_accessible_boards(self):
+        hidden = Board.objects.create(name='Ajeno', owner=User.objects.create_user(username='otro'))
+        Task.objects.create(title='Secreto compartido', task_list=hidden.lists.first())
+        self.assertEqual(self.suggest('secreto'), [])
+        hidden.members.add(self.user)
+        self.assertEqual(self.suggest('secreto'), ['Secreto compartido'])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.board = Board.objects.create(name='Paginado', owner=self.user)
+        self.task_list = self.board.lists.first()
+        # Created together, so many share created_at and the id breaks ties
+        Task.objects.bulk_create([Task(title=f'Tarea {i:03}', task_list=self.task_list, position=i,
+                                       priority='HML'[i % 3]) for i in range(45)])
+        rebuild_counters()
+
+    def walk(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_pages_follow_the_ordering_both_ways(self):
+        tasks = Task.objects.all()
+        for ordering in (['-created_at'], ['priority', '-title']):
+            paginator = KeysetPaginator(tasks, 10, ordering=ordering)
+            self.assertEqual(paginator.ordering[-1].lstrip('-'), 'pk')
+            pages = self.walk(paginator)
+            expected = list(tasks.order_by(*paginator.ordering))
+            self.assertEqual([task for page in pages for task in page], expected)
+            self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 5])
+            self.assertFalse(pages[0].has_previous())
+            back = paginator.page(pages[-1].previous_cursor)
+            self.assertEqual(list(back), list(pages[-2]))
+            self.assertTrue(back.has_next() and back.has_previous())
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        paginator = KeysetPaginator(Task.objects.values('id', 'title'), 10, ordering=['title'])
+        cursor = self.walk(paginator)[-2].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.page(cursor)
+        self.assertEqual([row['title'] for row in page], [f'Tarea {i:03}' for i in range(40, 45)])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_bad_cursors_and_orderings(self):
+        paginator = KeysetPaginator(Task.objects.all(), 10, ordering=['-created_at'])
+        self.assertEqual(list(paginator.get_page('basura')), list(paginator.page()))
+        self.assertEqual(list(paginator.get_page(encode_cursor(['titulo', 1]))), list(paginator.page()))
+        self.assertEqual(decode_cursor(encode_cursor([date(2026, 1, 2), 3], backwards=True)), (['2026-01-02', 3], True))
+        for ordering in (['?'], [F('title').asc()]):
+            with self.assertRaises(ValueError):
+                KeysetPaginator(Task.objects.all(), 10, ordering=ordering)
+
+    def spread_tasks(self):
+        # Some tasks dated, assigned or in another list; the rest NULL or in the first list
+        Task.objects.filter(position__lt=20).update(due_date=date(2030, 1, 1), assigned_to=self.user)
+        Task.objects.filter(position__lt=5).update(due_date=date(2029, 1, 1), task_list=self.board.lists.last())
+
+    def test_nullable_and_relation_orderings(self):
+        self.spread_tasks()
+        tasks = Task.objects.all()
+        for ordering, expected in (
+            (['due_date'], [F('due_date').asc(nulls_last=True), 'pk']),
+            (['-due_date'], [F('due_date').desc(nulls_first=True), '-pk']),
+            (['-assigned_to', 'title'], [F('assigned_to_id').desc(nulls_first=True), 'title', 'pk']),
+            (['task_list', '-position'], ['task_list__position', '-position', '-pk']),
+        ):
+            paginator = KeysetPaginator(tasks, 10, ordering=ordering)
+            pages = self.walk(paginator)
+            self.assertEqual([task for page in pages for task in page], list(tasks.order_by(*expected)), ordering)
+            back, cursor = [], pages[-1].previous_cursor
+            while cursor:
+                page = paginator.page(cursor)
+                back.insert(0, list(page))
+                cursor = page.previous_cursor
+            self.assertEqual(back, [list(page) for page in pages[:-1]], ordering)
+
+    def test_ranked_ids(self):
+        ids = list(range(100, 125))
+        first = paginate_ranked_ids(ids, 10)
+        second = paginate_ranked_ids(ids, 10, first.next_cursor)
+        third = paginate_ranked_ids(ids, 10, second.next_cursor)
+        self.assertEqual((list(second), list(third)), (ids[10:20], ids[20:]))
+        self.assertFalse(third.has_next())
+        self.assertEqual(list(paginate_ranked_ids(ids, 10, third.previous_cursor)), ids[10:20])
+        # A result moved up since the cursor was made is found by id
+        self.assertEqual(list(paginate_ranked_ids(ids[5:], 10, first.next_cursor)), ids[10:20])
+        self.assertEqual(list(paginate_ranked_ids(ids, 10, 'basura')), ids[:10])
+
+    def test_admin_changelist(self):
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:boards_task_changelist')
+        # More than the 100 rows of an admin page
+        Task.objects.bulk_create([Task(title=f'Tarea {i:03}', task_list=self.task_list, position=i)
+                                  for i in range(45, 120)])
+        titles = []
+        cursor = None
+        while True:
+            params = {'o': '1'}  # by title
+            if cursor:
+                params['cursor'] = cursor
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+            titles += [task.title for task in response.context['cl'].result_list]
+            page = response.context['cl'].paginator.current_page
+            if not page.has_next():
+                break
+            self.assertContains(response, f'cursor={page.next_cursor}')
+            cursor = page.next_cursor
+        self.assertEqual(titles, [f'Tarea {i:03}' for i in range(120)])
+
+    @override_settings(ADMIN_COUNT_LIMIT=110)
+    def test_admin_sorts_by_any_column_and_caps_the_count(self):
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:boards_task_changelist')
+        Task.objects.bulk_create([Task(title=f'Tarea {i:03}', task_list=self.task_list, position=i)
+                                  for i in range(45, 120)])
+        self.spread_tasks()
+
+        def nulls_last(value):
+            return (value is None, value or 0)
+        # Columns of list_display, counting the action checkbox
+        for sort, key, descending in (
+            ('2', lambda task: task.task_list.position, False),
+            ('-3', lambda task: nulls_last(task.assigned_to_id), True),
+            ('5', lambda task: nulls_last(task.due_date and task.due_date.toordinal()), False),
+        ):
+            tasks, cursor = [], None
+            while True:
+                params = {'o': sort, 'cursor': cursor} if cursor else {'o': sort}
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, params)
+                counts = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql']]
+                self.assertTrue(counts and all('LIMIT' in sql for sql in counts), counts)
+                self.assertContains(response, '110+ Tareas')
+                tasks += response.context['cl'].result_list
+                page = response.context['cl'].paginator.current_page
+                if not page.has_next():
+                    break
+                cursor = page.next_cursor
+            self.assertEqual(sorted(task.pk for task in tasks), list(Task.objects.order_by('pk').values_list('pk', flat=True)))
+            keys = [key(task) for task in tasks]
+            self.assertEqual(keys, sorted(keys, reverse=descending), sort)
+
+
+class CounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.todo, self.doing = self.board.lists.all()[:2]
+
+    def assertCounters(self, obj, task_count, completed_count, due_count, comment_count):
+        obj.refresh_from_db()
+        self.assertEqual(
+            (obj.task_count, obj.completed_count, obj.due_count, obj.comment_count),
+            (task_count, completed_count, due_count, comment_count)
+        )
+
+    def test_counters_follow_create_toggle_move_and_delete(self):
+        task = Task.objects.create(title='Task', task_list=self.todo, due_date=date.today())
+        Task.objects.create(title='Other', task_list=self.todo)
+        self.assertCounters(self.todo, 2, 0, 1, 0)
+        self.assertCounters(self.board, 2, 0, 1, 0)
+
+        task.completed = True
+        task.save()
+        self.assertCounters(self.todo, 2, 1, 0, 0)
+
+        TaskComment.objects.create(task=task, author=self.user, content='Hola')
+        task.refresh_from_db()
+        self.assertEqual(task.comment_count, 1)
+        task.task_list = self.doing
+        task.save()
+        self.assertCounters(self.todo, 1, 0, 0, 0)
+        self.assertCounters(self.doing, 1, 1, 0, 1)
+        self.assertCounters(self.board, 2, 1, 0, 1)
+
+        task.delete()
+        self.assertCounters(self.doing, 0, 0, 0, 0)
+        self.assertCounters(self.board, 1, 0, 0, 0)
+
+    def test_stale_instances_do_not_overwrite_counters(self):
+        stale_board = Board.objects.get(pk=self.board.pk)
+        stale_list = TaskList.objects.get(pk=self.todo.pk)
+        Task.objects.create(title='Task', task_list=self.todo)
+        stale_board.name = 'Renamed'
+        stale_board.save()
+        stale_list.name = 'Renamed'
+        stale_list.save()
+        self.assertCounters(self.todo, 1, 0, 0, 0)
+        self.assertCounters(self.board, 1, 0, 0, 0)
+
+    def test_deleting_a_list_updates_the_board(self):
+        task = Task.objects.create(title='Task', task_list=self.todo)
+        TaskComment.objects.create(task=task, author=self.user, content='Hola')
+        Task.objects.create(title='Other', task_list=self.doing)
+        TaskList.objects.get(pk=self.todo.pk).delete()
+        self.assertCounters(self.board, 1, 0, 0, 0)
+
+    def test_rebuild_counters_repairs_drift(self):
+        task = Task.objects.create(title='Task', task_list=self.todo, completed=True)
+        TaskComment.objects.create(task=task, author=self.user, content='Hola')
+        Board.objects.update(task_count=40, comment_count=7)
+        TaskList.objects.update(completed_count=0)
+        Task.objects.update(comment_count=3)
+        rebuild_counters()
+        self.assertCounters(self.todo, 1, 1, 0, 1)
+        self.assertCounters(self.board, 1, 1, 0, 1)
+
+    def test_board_list_reads_counters(self):
+        for i in range(3):
+            Task.objects.create(title=f'Task {i}', task_list=self.todo)
+        self.client.login(username='testuser', password='testpass123')
+        with override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+            response = self.client.get(reverse('board_list'))
+        self.assertContains(response, '3 tareas')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BoardListQueryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other',
+            first_name='Ana',
+            last_name='García',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def add_boards(self, count):
+        for i in range(count):
+            Board.objects.create(name=f'Own {i}', owner=self.user)
+            shared = Board.objects.create(name=f'Shared {i}', owner=self.other)
+            shared.members.add(self.user)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('board_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_board_count(self):
+        self.add_boards(2)
+        few = self.count_queries()
+        self.add_boards(30)
+        self.assertEqual(self.count_queries(), few)
+        self.assertLessEqual(few, 4)
+
+    def test_roles_and_annotations(self):
+        own = Board.objects.create(name='Own', owner=self.user)
+        own.members.add(self.user)
+        shared = Board.objects.create(name='Shared', owner=self.other)
+        shared.members.add(self.user)
+        Board.objects.create(name='Hidden', owner=self.other)
+        Task.objects.create(title='Task', task_list=shared.lists.first())
+
+        boards = {board.name: board for board in Board.objects.visible_to(self.user)}
+        self.assertEqual(set(boards), {'Own', 'Shared'})
+        self.assertTrue(boards['Own'].is_owner)
+        self.assertFalse(boards['Shared'].is_owner)
+        self.assertEqual(boards['Shared'].list_count, 3)
+        self.assertEqual(boards['Shared'].task_count, 1)
+        self.assertEqual(boards['Shared'].owner_name, 'Ana García')
+        self.assertEqual(boards['Own'].owner_name, 'testuser')
+
+
+class BoardAccessTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.member = User.objects.create_user(username='member', password='testpass123')
+        self.board = Board.objects.create(name='Test Board', owner=self.owner)
+        self.task = Task.objects.create(title='Task', task_list=self.board.lists.first())
+        self.client.login(username='member', password='testpass123')
+
+    def toggle(self):
+        return self.client.post(reverse('task_toggle_complete', kwargs={'pk': self.task.pk}))
+
+    def test_membership_changes_take_effect_immediately(self):
+        self.assertFalse(self.toggle().json()['success'])
+        self.board.members.add(self.member)
+        self.assertTrue(self.toggle().json()['success'])
+        self.member.boards.remove(self.board)
+        self.assertFalse(self.toggle().json()['success'])
+        self.board.members.add(self.member)
+        self.board.members.clear()
+        self.assertFalse(self.toggle().json()['success'])
+
+    def test_membership_set_is_cached_across_requests(self):
+        self.board.members.add(self.member)
+        member_board_ids(self.member)
+        request = RequestFactory().get('/')
+        request.user = self.member
+        # Only the membership version is read, once per request
+        with self.assertNumQueries(1):
+            self.assertTrue(has_board_access(request, self.board))
+            self.assertTrue(has_board_access(request, self.board))
+
+    def test_removal_is_seen_by_processes_with_a_stale_cache(self):
+        self.board.members.add(self.member)
+        self.assertTrue(self.toggle().json()['success'])
+        key = member_cache_key(self.member.pk, MembershipVersion.current(self.member.pk))
+        stale = cache.get(key)
+        self.assertIn(self.board.pk, stale)
+        self.board.members.remove(self.member)
+        # Another worker's cache still holds the set from before the removal
+        cache.clear()
+        cache.set(key, stale)
+        self.assertFalse(self.toggle().json()['success'])
+        self.assertNotIn(self.board.pk, member_board_ids(self.member))
+
+    def test_unrelated_users_cannot_rename_lists(self):
+        task_list = self.board.lists.first()
+        self.client.post(reverse('editar_lista', kwargs={'lista_id': task_list.pk}), {'nombre': 'Hacked'})
+        task_list.refresh_from_db()
+        self.assertNotEqual(task_list.name, 'Hacked')
+
+
+class TaskMoveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.todo, self.doing = self.board.lists.all()[:2]
+        self.tasks = [Task.objects.create(title=f'Task {i}', task_list=self.todo) for i in range(4)]
+        self.client.login(username='testuser', password='testpass123')
+
+    def titles(self, task_list):
+        return list(task_list.tasks.order_by('position', 'id').values_list('title', flat=True))
+
+    def move(self, task, task_list, **data):
+        response = self.client.post(
+            reverse('task_move', kwargs={'pk': task.pk}),
+            json.dumps({'new_list_id': task_list.pk, **data}),
+            content_type='application/json'
+        )
+        self.assertTrue(response.json()['success'])
+
+    def test_new_tasks_are_spaced(self):
+        self.assertEqual([t.position for t in self.tasks], [1024, 2048, 3072, 4096])
+
+    def test_move_between_neighbours_writes_only_the_moved_row(self):
+        before = dict(Task.objects.exclude(pk=self.tasks[3].pk).values_list('pk', 'position'))
+        self.move(self.tasks[3], self.todo, previous_task_id=self.tasks[0].pk, next_task_id=self.tasks[1].pk)
+        self.assertEqual(self.titles(self.todo), ['Task 0', 'Task 3', 'Task 1', 'Task 2'])
+        self.assertEqual(dict(Task.objects.exclude(pk=self.tasks[3].pk).values_list('pk', 'position')), before)
+
+    def test_move_to_other_list_by_neighbour_or_index(self):
+        self.move(self.tasks[0], self.doing)
+        self.move(self.tasks[1], self.doing, previous_task_id=self.tasks[0].pk)
+        self.move(self.tasks[2], self.doing, next_task_id=self.tasks[0].pk)
+        self.move(self.tasks[3], self.doing, new_position=1)
+        self.assertEqual(self.titles(self.doing), ['Task 2', 'Task 3', 'Task 0', 'Task 1'])
+        self.assertEqual(self.titles(self.todo), [])
+
+    def test_deleting_a_list_closes_the_gap(self):
+        self.todo.delete()
+        self.assertEqual(list(self.board.lists.values_list('name', 'position')), [
+            ('En progreso', 0), ('Terminado', 1)
+        ])
+
+    def test_benchmark_command_leaves_no_data(self):
+        out = StringIO()
+        call_command('benchmark_task_move', sizes=[5], repeat=1, stdout=out)
+        self.assertIn('move_to', out.getvalue())
+        self.assertFalse(Board.objects.filter(name='Benchmark').exists())
+
+    def test_exhausted_gap_makes_room(self):
+        Task.objects.filter(pk=self.tasks[1].pk).update(position=1025)
+        self.move(self.tasks[3], self.todo, previous_task_id=self.tasks[0].pk)
+        self.assertEqual(self.titles(self.todo), ['Task 0', 'Task 3', 'Task 1', 'Task 2'])
+        positions = list(self.todo.tasks.order_by('position').values_list('position', flat=True))
+        self.assertEqual(len(set(positions)), 4)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP caído')
+
+
+class NotificationOutboxTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.task_list = self.board.lists.first()
+
+    def test_assignment_is_queued_not_sent(self):
+        Task.objects.create(title='Task', task_list=self.task_list, assigned_to=self.user)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipient, 'test@example.com')
+        self.assertIn('Task', email.subject)
+
+    def test_rolled_back_change_queues_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Task.objects.create(title='Task', task_list=self.task_list, assigned_to=self.user)
+                raise RuntimeError
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_worker_sends_batches_over_one_connection(self):
+        for i in range(5):
+            Task.objects.create(title=f'Task {i}', task_list=self.task_list, assigned_to=self.user)
+        call_command('send_notifications', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutgoingEmail.objects.filter(sent_at__isnull=True).exists())
+
+    @override_settings(EMAIL_BACKEND='boards.tests.FailingEmailBackend', NOTIFICATION_RETRY_DELAY=60)
+    def test_failures_back_off(self):
+        Task.objects.create(title='Task', task_list=self.task_list, assigned_to=self.user)
+        self.assertEqual(send_due_emails(), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('SMTP caído', email.last_error)
+        self.assertGreater(email.send_after, timezone.now() + timedelta(seconds=50))
+        # Not due yet, so the next run leaves it alone
+        self.assertEqual(send_due_emails(), (0, 0))
+        OutgoingEmail.objects.update(send_after=timezone.now())
+        send_due_emails()
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+
+
+class TaskChangeTrackingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(username='other', email='other@example.com')
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.todo, self.doing = self.board.lists.all()[:2]
+        self.task = Task.objects.create(title='Task', task_list=self.todo, assigned_to=self.user)
+
+    def test_changed_fields(self):
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(task.changed_fields, set())
+        task.title = 'Renamed'
+        task.task_list = self.doing
+        self.assertEqual(task.changed_fields, {'title', 'task_list'})
+        task.save()
+        self.assertEqual(task.changed_fields, set())
+        self.assertIn('title', Task(title='New').changed_fields)
+
+    def test_loading_a_deferred_field_keeps_pending_changes(self):
+        task = Task.objects.only('id', 'title', 'task_list').get(pk=self.task.pk)
+        task.title = 'Renamed'
+        task.description  # refresh_from_db(fields=['description'])
+        self.assertEqual(task.changed_fields, {'title'})
+        task.save()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).title, 'Renamed')
+
+    def test_unchanged_save_is_skipped(self):
+        task = Task.objects.get(pk=self.task.pk)
+        with self.assertNumQueries(0):
+            task.save()
+
+    def test_save_writes_only_changed_columns(self):
+        task = Task.objects.get(pk=self.task.pk)
+        Task.objects.filter(pk=task.pk).update(title='Edited elsewhere')
+        task.completed = True
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        task_queries = [q['sql'] for q in queries if 'FROM "boards_task"' in q['sql'] or 'UPDATE "boards_task"' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.title, 'Edited elsewhere')
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.completed_count, 1)
+
+    def test_reassignment_is_notified(self):
+        OutgoingEmail.objects.all().delete()
+        task = Task.objects.get(pk=self.task.pk)
+        task.assigned_to = self.other
+        task.save()
+        self.assertEqual(OutgoingEmail.objects.get().recipient, 'other@example.com')
+        task.title = 'Renamed'
+        task.save()
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+
+class DigestTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.board = Board.objects.create(
+            name='Test Board',
+            owner=self.user
+        )
+        self.task_list = self.board.lists.first()
+        NotificationPreference.objects.create(user=self.user, delivery=NotificationPreference.DIGEST)
+
+    def test_assignments_are_buffered_and_flushed_as_one_email(self):
+        tasks = [Task.objects.create(title=f'Task {i}', task_list=self.task_list, assigned_to=self.user)
+                 for i in range(5)]
+        self.assertFalse(OutgoingEmail.objects.exists())
+        self.assertEqual(DigestItem.objects.count(), 5)
+
+        # Still inside the window
+        self.assertEqual(flush_digests(), 0)
+        DigestItem.objects.update(created_at=timezone.now() - timedelta(minutes=10))
+        with self.assertNumQueries(5):
+            self.assertEqual(flush_digests(), 1)
+        email = OutgoingEmail.objects.get()
+        self.assertIn('5 tareas', email.subject)
+        for task in tasks:
+            self.assertIn(task.title, email.body)
+        self.assertFalse(DigestItem.objects.exists())
+
+    def test_immediate_delivery_is_the_default(self):
+        other = User.objects.create_user(username='other', email='other@example.com')
+        Task.objects.create(title='Task', task_list=self.task_list, assigned_to=other)
+        self.assertEqual(OutgoingEmail.objects.get().recipient, 'other@example.com')
+        self.assertFalse(DigestItem.objects.exists())
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_preference_view(self):
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('notification_preferences'), {'delivery': 'immediate'})
+        self.assertRedirects(response, reverse('notification_preferences'))
+        self.assertEqual(NotificationPreference.objects.get(user=self.user).delivery, 'immediate')
+
+
+class BoardTemplateTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.template = BoardTemplate.objects.create(name='Sprint', lists=[
+            {'name': 'Backlog', 'tasks': [{'title': 'Planificar', 'labels': 'scrum'}, {'title': 'Estimar'}]},
+            {'name': 'Sprint'},
+            {'name': 'Hecho'},
+        ])
+
+    def test_default_lists_cost_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            board = Board.objects.create(name='Test Board', owner=self.user)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(list(board.lists.values_list('name', 'position')), [
+            ('Por hacer', 0), ('En progreso', 1), ('Terminado', 2)
+        ])
+
+    def test_template_lists_and_seed_cards(self):
+        board = Board(name='Test Board', owner=self.user)
+        board.template = self.template
+        board.save()
+        backlog = board.lists.get(name='Backlog')
+        self.assertEqual(list(backlog.tasks.values_list('title', flat=True)), ['Planificar', 'Estimar'])
+        self.assertEqual(list(board.labels.values_list('name', flat=True)), ['scrum'])
+        board.refresh_from_db()
+        backlog.refresh_from_db()
+        self.assertEqual((board.task_count, backlog.task_count), (2, 2))
+
+    def test_apply_appends_after_existing_lists(self):
+        board = Board.objects.create(name='Test Board', owner=self.user)
+        self.template.apply(board)
+        self.assertEqual(list(board.lists.values_list('position', flat=True)), [0, 1, 2, 3, 4, 5])
+
+    def test_clean_rejects_malformed_lists(self):
+        with self.assertRaises(ValidationError):
+            BoardTemplate(name='Roto', lists=[{'tasks': []}]).full_clean()
+
+    def test_create_board_from_form(self):
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('board_create'), {'name': 'Nuevo', 'template': self.template.pk})
+        board = Board.objects.get(name='Nuevo')
+        self.assertEqual(list(board.lists.values_list('name', flat=True)), ['Backlog', 'Sprint', 'Hecho'])
+
+
+class PositionAllocatorTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.board = Board.objects.create(name='Test Board', owner=self.user)
+        self.task_list = self.board.lists.first()
+
+    def test_appends_do_not_scan_the_list(self):
+        Task.objects.create(title='First', task_list=self.task_list)
+        with CaptureQueriesContext(connection) as queries:
+            task = Task.objects.create(title='Second', task_list=self.task_list)
+        self.assertEqual(task.position, 2 * Task.POSITION_GAP)
+        self.assertFalse([q for q in queries if 'MAX(' in q['sql'] or 'ORDER BY "boards_task"."position" DESC' in q['sql']])
+
+    def test_reserving_a_range(self):
+        self.assertEqual(TaskList.allocate_positions(self.task_list.pk, 3), [1024, 2048, 3072])
+        self.assertEqual(TaskList.allocate_positions(self.task_list.pk), [4096])
+
+    def test_append_after_shift_stays_last(self):
+        first = Task.objects.create(title='First', task_list=self.task_list)
+        second = Task.objects.create(title='Second', task_list=self.task_list)
+        Task.objects.filter(pk=second.pk).update(position=first.position + 1)
+        Task.objects.create(title='Third', task_list=self.task_list).move_to(self.task_list, previous_id=first.pk)
+        last = Task.objects.create(title='Last', task_list=self.task_list)
+        self.assertEqual(self.task_list.tasks.order_by('position').last(), last)
+
+
+class ConcurrentAppendTest(TransactionTestCase):
+    THREADS = 8
+    TASKS_PER_THREAD = 5
+
+    def test_concurrent_appends_get_distinct_positions(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        board = Board.objects.create(name='Test Board', owner=user)
+        task_list = board.lists.first()
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def append(n):
+            try:
+                barrier.wait()
+                for i in range(self.TASKS_PER_THREAD):
+                    # SQLite serializes writers; retry instead of failing the test on a busy lock
+                    for _ in range(100):
+                        try:
+                            Task.objects.create(title=f'Task {n}-{i}', task_list=task_list)
+                            break
+                        except OperationalError:
+                            time.sleep(0.01)
+                    else:
+                        errors.append(f'Task {n}-{i} never got the lock')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=append, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        positions = list(task_list.tasks.values_list('position', flat=True))
+        self.assertEqual(len(positions), self.THREADS * self.TASKS_PER_THREAD)
+        self.assertEqual(len(set(positions)), len(positions))
+        task_list.refresh_from_db()
+        self.assertEqual(task_list.task_count, len(positions))
+
+
+class NdjsonExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bi', password='testpass123')
+        self.board = Board.objects.create(name='Métricas', owner=self.user)
+        self.todo, self.doing = self.board.lists.all()[:2]
+        self.old = Task.objects.create(title='Vieja', task_list=self.todo, labels='api, Rápido')
+        self.new = Task.objects.create(title='Nueva', task_list=self.doing, assigned_to=self.user)
+        Task.objects.filter(pk=self.old.pk).update(updated_at=timezone.now() - timedelta(days=2))
+        self.client.login(username='bi', password='testpass123')
+        self.url = reverse('export_board_ndjson', kwargs={'pk': self.board.pk})
+
+    def records(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        text = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertTrue(text == '' or text.endswith('\n'))
+        return [json.loads(line) for line in text.splitlines()]
+
+    def test_one_denormalized_record_per_task(self):
+        records = self.records(self.client.get(self.url))
+        self.assertEqual([record['task_id'] for record in records], [self.old.pk, self.new.pk])
+        first = records[0]
+        self.assertEqual((first['board_id'], first['board'], first['list_id'], first['list']),
+                         (self.board.pk, 'Métricas', self.todo.pk, self.todo.name))
+        self.assertEqual(first['labels'], ['api', 'Rápido'])
+        self.assertEqual(records[1]['assigned_to'], 'bi')
+
+    def test_updated_since_filters_unchanged_tasks(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        records = self.records(self.client.get(self.url, {'updated_since': since}))
+        self.assertEqual([record['task_id'] for record in records], [self.new.pk])
+
+        # A shift that renumbers cards counts as a change
+        self.todo.shift_tasks(Task.POSITION_GAP)
+        records = self.records(self.client.get(self.url, {'updated_since': since}))
+        self.assertEqual({record['task_id'] for record in records}, {self.old.pk, self.new.pk})
+
+        self.assertEqual(self.client.get(self.url, {'updated_since': 'ayer'}).status_code, 400)
+        self.assertEqual(self.records(self.client.get(self.url, {'updated_since': '2999-01-01'})), [])
+
+    def test_no_access(self):
+        User.objects.create_user(username='intruso', password='testpass123')
+        self.client.login(username='intruso', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class BoardImportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='origen', password='testpass123')
+        self.ana = User.objects.create_user(username='ana', first_name='Ana', last_name='García')
+        self.board = Board.objects.create(name='Origen', description='Copia', owner=self.user)
+        self.board.members.add(self.ana)
+        todo, doing = self.board.lists.all()[:2]
+        self.task = Task.objects.create(title='Con todo', task_list=todo, labels='api, Rápido', priority='C',
+                                        assigned_to=self.ana, due_date=date(2030, 1, 2), completed=True)
+        Task.objects.create(title='Segunda', task_list=todo)
+        Task.objects.create(title='Otra lista', task_list=doing, assigned_to=self.user)
+        TaskComment.objects.create(task=self.task, author=self.ana, content='Hola')
+        self.export = ''.join(stream_board_json(self.board, include_comments=True)).encode('utf-8')
+
+    def test_round_trip(self):
+        self.client.login(username='origen', password='testpass123')
+        response = self.client.post(reverse('board_import'), {
+            'file': SimpleUploadedFile('origen.json', self.export, content_type='application/json'),
+        })
+        board = Board.objects.exclude(pk=self.board.pk).get()
+        self.assertRedirects(response, reverse('board_detail', kwargs={'pk': board.pk}), fetch_redirect_response=False)
+        self.assertEqual((board.name, board.description, board.owner), ('Origen', 'Copia', self.user))
+
+        # Same lists back, creation dates included, and no default lists added on top
+        self.assertEqual(''.join(stream_board_json(board, include_comments=True)).split('"lists"')[1],
+                         self.export.decode('utf-8').split('"lists"')[1])
+        imported = Task.objects.get(task_list__board=board, title='Con todo')
+        self.assertEqual(imported.created_at, self.task.created_at)
+        self.assertEqual(imported.comments.get().created_at, self.task.comments.get().created_at)
+        self.assertEqual(imported.assigned_to, self.ana)
+        labels = imported.task_labels.order_by('position').values_list('label__name', flat=True)
+        self.assertEqual(list(labels), ['api', 'Rápido'])
+        self.assertEqual(list(imported.comments.values_list('author__username', 'content')), [('ana', 'Hola')])
+        self.assertEqual(list(board.members.all()), [self.ana])
+
+        board.refresh_from_db()
+        self.assertEqual((board.task_count, board.completed_count, board.comment_count), (3, 1, 1))
+        first_list = board.lists.get(position=0)
+        self.assertEqual(first_list.last_position, 2 * Task.POSITION_GAP)
+        self.assertEqual(Task.objects.create(title='Nueva', task_list=first_list).position, 3 * Task.POSITION_GAP)
+
+    def test_names_only_match_users_sharing_a_board(self):
+        User.objects.create_superuser(username='admin', first_name='Jefa')
+        document = json.dumps({'board': {'name': 'Falso'}, 'lists': [{'name': 'Lista', 'tasks': [
+            {'title': 'Para la jefa', 'assigned_to_username': 'admin',
+             'comments': [{'author_username': 'admin', 'content': 'Aprobado'}, {'author': 'Jefa', 'content': 'Sí'}]},
+            {'title': 'Para Ana', 'assigned_to': 'Ana García'},
+        ]}]}).encode('utf-8')
+        board = import_board(io.BytesIO(document), self.user)
+        task = board.lists.get().tasks.get(title='Para la jefa')
+        self.assertIsNone(task.assigned_to)
+        self.assertEqual(set(task.comments.values_list('author__username', flat=True)), {'origen'})
+        self.assertEqual(board.lists.get().tasks.get(title='Para Ana').assigned_to, self.ana)
+        self.assertEqual(list(board.members.all()), [self.ana])
+
+    def test_incremental_parsing_across_chunk_boundaries(self):
+        document = '{"a": [12345, "ñandú", {"b": [true, null]}], "c": 1.5e3}'.encode('utf-8')
+        for read_size in (1, 2, 3, 7):
+            stream = JsonStream(io.BytesIO(document), read_size=read_size)
+            seen = {}
+            for key in stream.object_items():
+                if key == 'a':
+                    seen[key] = []
+                    for _ in stream.array_items():
+                        seen[key].append(stream.value())
+                else:
+                    seen[key] = stream.value()
+            self.assertTrue(stream.at_end())
+            self.assertEqual(seen, json.loads(document))
+
+    def test_malformed_file_leaves_nothing(self):
+        boards = Board.objects.count()
+        for document in (self.export[:-40], b'{"lists": [{"tasks": []}]}', b'[]', self.export + b'{}'):
+            with self.assertRaises(BoardImportError):
+                import_board(io.BytesIO(document), self.user)
+        self.assertEqual(Board.objects.count(), boards)
+
+    def test_bulk_import_query_count(self):
+        lists = [{'name': f'Lista {i}', 'tasks': [{'title': f'Tarea {i}-{j}', 'labels': ['x']}
+                                                  for j in range(300)]} for i in range(4)]
+        document = json.dumps({'board': {'name': 'Grande'}, 'lists': lists}).encode('utf-8')
+        with CaptureQueriesContext(connection) as queries:
+            board = import_board(io.BytesIO(document), self.user)
+        # Per-list and per-chunk queries only, never per task
+        self.assertLess(len(queries), 40)
+        self.assertEqual(board.lists.count(), 4)
+        board.refresh_from_db()
+        self.assertEqual(board.task_count, 1200)
+
+    def test_command(self):
+        path = f'{tempfile.mkdtemp()}/origen.json'
+        self.addCleanup(shutil.rmtree, path.rsplit('/', 1)[0])
+        with open(path, 'wb') as f:
+            f.write(self.export)
+        out = StringIO()
+        call_command('import_board', path, owner='ana', name='Restaurado', stdout=out)
+        board = Board.objects.get(name='Restaurado')
+        self.assertEqual(board.owner, self.ana)
+        self.assertIn('3 tareas', out.getvalue())
+
+
+class ExportJobTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, EXPORT_WORKERS=1,
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='exporter', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.own = Board.objects.create(name='Propio', owner=self.user)
+        self.shared = Board.objects.create(name='Compartido', owner=self.other)
+        self.shared.members.add(self.user)
+        self.hidden = Board.objects.create(name='Ajeno', owner=self.other)
+        self.client.login(username='exporter', password='testpass123')
+
+    def run_job(self, **kwargs):
+        ExportJob.objects.create(user=self.user, **kwargs)
+        job = claim_export_job()
+        self.assertEqual(job.status, ExportJob.RUNNING)
+        run_export_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_archive_holds_every_accessible_board(self):
+        Task.objects.create(title='Exportada', task_list=self.own.lists.first())
+        job = self.run_job()
+        self.assertEqual(job.status, ExportJob.DONE)
+        self.assertEqual((job.boards_done, job.boards_total, job.progress), (2, 2, 100))
+        with zipfile.ZipFile(f'{self.media_root}/{job.file}') as archive:
+            names = sorted(archive.namelist())
+            self.assertEqual(names, sorted([f'{self.own.pk}-propio.json', f'{self.shared.pk}-compartido.json']))
+            document = json.loads(archive.read(f'{self.own.pk}-propio.json'))
+        self.assertEqual(document, json.loads(''.join(stream_board_json(self.own))))
+        self.assertIsNone(claim_export_job())
+
+    @override_settings(EXPORT_LEASE=60, EXPORT_MAX_ATTEMPTS=2)
+    def test_jobs_of_dead_workers_are_claimed_again(self):
+        ExportJob.objects.create(user=self.user)
+        lost = claim_export_job()
+        # The worker dies without another heartbeat
+        self.assertIsNone(claim_export_job())
+        ExportJob.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        job = claim_export_job()
+        self.assertEqual((job.pk, job.attempts), (lost.pk, 2))
+
+        # The run that lost its lease can no longer write to the job
+        with self.assertRaises(ExportJobLost):
+            run_export_job(lost)
+        run_export_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+
+        ExportJob.objects.create(user=self.user)
+        claim_export_job()
+        ExportJob.objects.filter(status=ExportJob.RUNNING).update(
+            attempts=2, heartbeat_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertIsNone(claim_export_job())
+        self.assertEqual(ExportJob.objects.filter(status=ExportJob.FAILED).count(), 1)
+        self.client.post(reverse('export_jobs'))
+        self.assertEqual(ExportJob.objects.filter(status=ExportJob.PENDING).count(), 1)
+
+    @override_settings(EXPORT_LEASE=0.4)
+    def test_a_board_slower_than_the_lease_keeps_it(self):
+        claims = []
+
+        def slow_board_json(board, include_comments=False):
+            for _ in range(4):
+                time.sleep(0.2)
+                yield ''
+            # Another worker looks for work once the board has outlived the lease
+            claims.append(claim_export_job())
+            yield from stream_board_json(board, include_comments)
+
+        with mock.patch('boards.export.stream_board_json', slow_board_json):
+            job = self.run_job()
+        self.assertEqual(claims, [None, None])
+        self.assertEqual((job.status, job.attempts), (ExportJob.DONE, 1))
+
+    def test_status_and_queueing(self):
+        self.client.post(reverse('export_jobs'))
+        self.client.post(reverse('export_jobs'))
+        self.assertEqual(ExportJob.objects.filter(user=self.user).count(), 1)
+
+        job = ExportJob.objects.get(user=self.user)
+        data = self.client.get(reverse('export_job_status', kwargs={'pk': job.pk})).json()
+        self.assertEqual((data['status'], data['progress'], data['download_url']), ('pending', 0, None))
+        self.assertEqual(self.client.get(reverse('export_jobs')).status_code, 200)
+
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(reverse('export_job_status', kwargs={'pk': job.pk})).status_code, 404)
+
+    def test_download_supports_ranges(self):
+        job = self.run_job()
+        url = reverse('export_job_download', kwargs={'pk': job.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(content), job.size)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{job.size}')
+        self.assertEqual(b''.join(response.streaming_content), content[10:20])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(b''.join(response.streaming_content), content[100:])
+        response = self.client.get(url, HTTP_RANGE='bytes=-50')
+        self.assertEqual(b''.join(response.streaming_content), content[-50:])
+
+        # A stale validator or a range past the end of the file
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"').status_code, 200)
+        response = self.client.get(url, HTTP_RANGE=f'bytes={job.size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{job.size}')
@@ -7,10 +7,12 @@ urlpatterns = [
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('register/', views.register_view, name='register'),
+    path('notifications/', views.notification_preferences, name='notification_preferences'),
     
     # Board URLs
     path('', views.board_list, name='board_list'),
     path('boards/create/', views.board_create, name='board_create'),
+    path('boards/import/', views.board_import, name='board_import'),
     path('boards/<int:pk>/', views.board_detail, name='board_detail'),
     path('boards/<int:pk>/edit/', views.board_edit, name='board_edit'),
     path('boards/<int:pk>/delete/', views.board_delete, name='board_delete'),
@@ -20,6 +22,7 @@ urlpatterns = [
     path('listas/<int:lista_id>/editar/', views.editar_lista, name='editar_lista'),
     path('lists/<int:pk>/delete/', views.task_list_delete, name='task_list_delete'),
     path('lists/<int:pk>/edit/', views.task_list_edit, name='task_list_edit'),
+    path('lists/<int:pk>/tasks/', views.task_list_tasks, name='task_list_tasks'),
     
     # Task URLs
     path('boards/<int:board_pk>/tasks/create/', views.task_create, name='task_create'),
@@ -34,7 +37,12 @@ urlpatterns = [
     # Export URLs
     path('boards/<int:pk>/export/csv/', views.export_board_csv, name='export_board_csv'),
     path('boards/<int:pk>/export/json/', views.export_board_json, name='export_board_json'),
+    path('boards/<int:pk>/export/ndjson/', views.export_board_ndjson, name='export_board_ndjson'),
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/<int:pk>/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
     
     # Search URLs
     path('search/', views.search_tasks, name='search_tasks'),
+    path('search/suggest/', views.suggest_tasks, name='suggest_tasks'),
 ]
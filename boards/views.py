@@ -1,22 +1,78 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from django.middleware.csrf import get_token
 from django.db import transaction
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from django.urls import reverse
+import hashlib
 import json
-import csv
-from .models import Board, TaskList, Task, TaskComment
+import os
+import re
+from datetime import datetime, time
+from .models import Board, TaskList, Task, TaskComment, NotificationPreference, ExportJob
+from .access import has_board_access
+from .importer import BoardImportError, import_board
+from .pagination import CURSOR_VAR, KeysetPaginator, paginate_ranked_ids
+from .search import get_search_backend, highlight, run_search, search_filters, user_boards
+from .export import stream_board_csv, stream_board_json, stream_board_ndjson
+from .snapshot import get_board_snapshot, load_list_page
 from .forms import (
     CustomUserCreationForm, BoardForm, TaskListForm, 
-    TaskForm, QuickTaskForm, TaskCommentForm, TaskMoveForm
+    TaskForm, QuickTaskForm, TaskCommentForm, TaskMoveForm, NotificationPreferenceForm, BoardImportForm
 )
 
 
+def board_validators(request, board, variant, per_user=True):
+    """Return the (ETag, Last-Modified timestamp) of a view of the board.
+
+    Board.version is bumped on every write to the board, its lists, tasks and
+    comments, so it is enough to tell whether a cached copy is still current
+    without touching the tasks. Pages embed per-user navigation, date
+    dependent overdue flags and the CSRF token board.js posts with, so all
+    three are part of their tag too: a new login rotates the CSRF secret and
+    must not revalidate a page holding the dead token.
+    """
+    parts = [variant, str(board.pk), str(board.version)]
+    if per_user:
+        get_token(request)
+        csrf = hashlib.md5(request.META['CSRF_COOKIE'].encode()).hexdigest()[:12]
+        parts += [str(request.user.pk), timezone.now().date().isoformat(), csrf]
+    return '"%s"' % '-'.join(parts), int(board.updated_at.timestamp())
+
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the client's copy is current, else None"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # A page with pending flash messages must be rendered to show them
+    if len(messages.get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """Attach the validators so the client can revalidate with a conditional GET"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Always revalidate: without this browsers would heuristically reuse the
+    # page for a while based on Last-Modified and show a stale board
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def register_view(request):
     """User registration view"""
     if request.method == 'POST':
@@ -31,12 +87,28 @@ def register_view(request):
     return render(request, 'registration/register.html', {'form': form})
 
 
+@login_required
+def notification_preferences(request):
+    """Choose between one email per assignment and a periodic digest"""
+    preference, _ = NotificationPreference.objects.get_or_create(user=request.user)
+    if request.method == 'POST':
+        form = NotificationPreferenceForm(request.POST, instance=preference)
+        if form.is_valid():
+            form.save()
+            messages.success(request, 'Preferencias de notificaciones actualizadas.')
+            return redirect('notification_preferences')
+    else:
+        form = NotificationPreferenceForm(instance=preference)
+    return render(request, 'boards/notification_preferences.html', {'form': form})
+
+
 @login_required
 def board_list(request):
     """List all boards for the current user"""
-    owned_boards = Board.objects.filter(owner=request.user)
-    member_boards = Board.objects.filter(members=request.user)
-    
+    boards = list(Board.objects.visible_to(request.user))
+    owned_boards = [board for board in boards if board.is_owner]
+    member_boards = [board for board in boards if not board.is_owner]
+
     context = {
         'owned_boards': owned_boards,
         'member_boards': member_boards,
@@ -50,19 +122,24 @@ def board_detail(request, pk):
     board = get_object_or_404(Board, pk=pk)
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para ver este tablero.')
         return redirect('board_list')
     
-    lists = board.lists.prefetch_related('tasks__assigned_to').all()
+    etag, last_modified = board_validators(request, board, 'board')
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return response
+    
+    snapshot = get_board_snapshot(board)
     
     context = {
         'board': board,
-        'lists': lists,
+        'lists': snapshot['lists'],
         'quick_task_form': QuickTaskForm(),
         'task_list_form': TaskListForm(),
     }
-    return render(request, 'boards/board_detail.html', context)
+    return set_validators(render(request, 'boards/board_detail.html', context), etag, last_modified)
 
 
 @login_required
@@ -73,6 +150,7 @@ def board_create(request):
         if form.is_valid():
             board = form.save(commit=False)
             board.owner = request.user
+            board.template = form.cleaned_data['template']
             board.save()
             form.save_m2m()  # Save many-to-many relationships
             messages.success(request, f'Tablero "{board.name}" creado exitosamente.')
@@ -83,6 +161,25 @@ def board_create(request):
     return render(request, 'boards/board_form.html', {'form': form, 'title': 'Crear Tablero'})
 
 
+@login_required
+def board_import(request):
+    """Create a board from a file produced by the JSON export"""
+    if request.method == 'POST':
+        form = BoardImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                board = import_board(form.cleaned_data['file'], request.user, form.cleaned_data['name'])
+            except BoardImportError as e:
+                form.add_error('file', str(e))
+            else:
+                messages.success(request, f'Tablero "{board.name}" importado con {board.task_count} tareas.')
+                return redirect('board_detail', pk=board.pk)
+    else:
+        form = BoardImportForm()
+    
+    return render(request, 'boards/board_import.html', {'form': form})
+
+
 @login_required
 def board_edit(request, pk):
     """Edit an existing board"""
@@ -124,7 +221,7 @@ def task_list_create(request, board_pk):
     board = get_object_or_404(Board, pk=board_pk)
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para modificar este tablero.')
         return redirect('board_list')
     
@@ -142,7 +239,10 @@ def task_list_create(request, board_pk):
 
 @login_required
 def task_list_edit(request, pk):
-    lista = get_object_or_404(TaskList, pk=pk)
+    lista = get_object_or_404(TaskList.objects.select_related('board'), pk=pk)
+    if not has_board_access(request, lista.board):
+        messages.error(request, 'No tienes permiso para modificar este tablero.')
+        return redirect('board_list')
     if request.method == 'POST':
         nuevo_nombre = request.POST.get('nombre')
         if nuevo_nombre:
@@ -156,11 +256,11 @@ def task_list_edit(request, pk):
 @login_required
 def task_list_delete(request, pk):
     """Delete a task list"""
-    task_list = get_object_or_404(TaskList, pk=pk)
+    task_list = get_object_or_404(TaskList.objects.select_related('board'), pk=pk)
     board = task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para modificar este tablero.')
         return redirect('board_list')
     
@@ -182,7 +282,7 @@ def task_create(request, board_pk, list_pk=None):
     board = get_object_or_404(Board, pk=board_pk)
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para modificar este tablero.')
         return redirect('board_list')
     
@@ -208,11 +308,11 @@ def task_create(request, board_pk, list_pk=None):
 @login_required
 def quick_task_create(request, list_pk):
     """Create a quick task via AJAX"""
-    task_list = get_object_or_404(TaskList, pk=list_pk)
+    task_list = get_object_or_404(TaskList.objects.select_related('board'), pk=list_pk)
     board = task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         return JsonResponse({'success': False, 'error': 'Sin permisos'})
     
     if request.method == 'POST':
@@ -236,17 +336,48 @@ def quick_task_create(request, list_pk):
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
 
+@login_required
+def task_list_tasks(request, pk):
+    """Return the next page of a list's cards via AJAX, in position order"""
+    task_list = get_object_or_404(TaskList.objects.select_related('board'), pk=pk)
+    board = task_list.board
+    
+    # Check if user has access to this board
+    if not has_board_access(request, board):
+        return JsonResponse({'success': False, 'error': 'Sin permisos'}, status=403)
+    
+    try:
+        page_size = getattr(settings, 'BOARD_LIST_PAGE_SIZE', 50)
+        limit = min(int(request.GET.get('limit', page_size)), getattr(settings, 'BOARD_LIST_PAGE_SIZE_MAX', 200))
+        page = load_list_page(task_list, cursor=request.GET.get('cursor'), limit=max(limit, 1))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Parámetros inválidos'}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'html': render_to_string('boards/task_card_list.html', {'tasks': page['tasks']}, request=request),
+        'task_ids': [task['id'] for task in page['tasks']],
+        'has_more': page['has_more'],
+        'next_cursor': page['next_cursor'],
+    })
+
+
 @login_required
 def task_detail(request, pk):
     """Display task details"""
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__board'), pk=pk)
     board = task.task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para ver esta tarea.')
         return redirect('board_list')
     
+    etag, last_modified = board_validators(request, board, f'task-{task.pk}')
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return response
+    
     comments = task.comments.select_related('author').all()
     
     if request.method == 'POST':
@@ -267,17 +398,21 @@ def task_detail(request, pk):
         'comments': comments,
         'comment_form': comment_form,
     }
-    return render(request, 'boards/task_detail.html', context)
+    response = render(request, 'boards/task_detail.html', context)
+    if request.method == 'POST':
+        # Invalid comment: the page shows the form errors, not the stored task
+        return response
+    return set_validators(response, etag, last_modified)
 
 
 @login_required
 def task_edit(request, pk):
     """Edit a task"""
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__board'), pk=pk)
     board = task.task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para modificar esta tarea.')
         return redirect('board_list')
     
@@ -301,11 +436,11 @@ def task_edit(request, pk):
 @login_required
 def task_delete(request, pk):
     """Delete a task"""
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__board'), pk=pk)
     board = task.task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para modificar esta tarea.')
         return redirect('board_list')
     
@@ -325,11 +460,11 @@ def task_delete(request, pk):
 @require_POST
 def task_move(request, pk):
     """Move a task to a different list via AJAX"""
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__board'), pk=pk)
     board = task.task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         return JsonResponse({'success': False, 'error': 'Sin permisos'})
     
     try:
@@ -341,55 +476,12 @@ def task_move(request, pk):
         new_list = get_object_or_404(TaskList, pk=new_list_id, board=board)
         
         with transaction.atomic():
-            old_list = task.task_list
-            old_position = task.position
-            
-            # If moving within the same list, adjust positions
-            if old_list == new_list:
-                if new_position < old_position:
-                    # Moving up in the same list
-                    tasks_to_update = Task.objects.filter(
-                        task_list=old_list,
-                        position__gte=new_position,
-                        position__lt=old_position
-                    )
-                    for t in tasks_to_update:
-                        t.position += 1
-                        t.save()
-                elif new_position > old_position:
-                    # Moving down in the same list
-                    tasks_to_update = Task.objects.filter(
-                        task_list=old_list,
-                        position__gt=old_position,
-                        position__lte=new_position
-                    )
-                    for t in tasks_to_update:
-                        t.position -= 1
-                        t.save()
-            else:
-                # Moving to a different list
-                # Adjust positions in old list
-                tasks_in_old_list = Task.objects.filter(
-                    task_list=old_list,
-                    position__gt=old_position
-                )
-                for t in tasks_in_old_list:
-                    t.position -= 1
-                    t.save()
-                
-                # Adjust positions in new list
-                tasks_in_new_list = Task.objects.filter(
-                    task_list=new_list,
-                    position__gte=new_position
-                )
-                for t in tasks_in_new_list:
-                    t.position += 1
-                    t.save()
-            
-            # Update the task itself
-            task.task_list = new_list
-            task.position = new_position
-            task.save()
+            task.move_to(
+                new_list,
+                previous_id=data.get('previous_task_id'),
+                next_id=data.get('next_task_id'),
+                index=new_position,
+            )
         
         return JsonResponse({
             'success': True,
@@ -405,11 +497,11 @@ def task_move(request, pk):
 @login_required
 def task_toggle_complete(request, pk):
     """Toggle task completion status"""
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('task_list__board'), pk=pk)
     board = task.task_list.board
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         return JsonResponse({'success': False, 'error': 'Sin permisos'})
     
     task.completed = not task.completed
@@ -427,33 +519,20 @@ def export_board_csv(request, pk):
     board = get_object_or_404(Board, pk=pk)
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         messages.error(request, 'No tienes permiso para exportar este tablero.')
         return redirect('board_list')
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{board.name}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Lista', 'Tarea', 'Descripción', 'Fecha límite', 
-        'Prioridad', 'Asignado a', 'Etiquetas', 'Completada'
-    ])
-    
-    for task_list in board.lists.all():
-        for task in task_list.tasks.all():
-            writer.writerow([
-                task_list.name,
-                task.title,
-                task.description,
-                task.due_date.strftime('%Y-%m-%d') if task.due_date else '',
-                task.get_priority_display(),
-                task.assigned_to.get_full_name() if task.assigned_to else '',
-                task.labels,
-                'Sí' if task.completed else 'No'
-            ])
+    etag, last_modified = board_validators(request, board, 'csv', per_user=False)
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return response
     
-    return response
+    # Streamed straight from a chunked query, so memory stays flat
+    # whatever the size of the board
+    response = StreamingHttpResponse(stream_board_csv(board), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{board.name}.csv"'
+    return set_validators(response, etag, last_modified)
 
 
 @login_required
@@ -462,83 +541,282 @@ def export_board_json(request, pk):
     board = get_object_or_404(Board, pk=pk)
     
     # Check if user has access to this board
-    if not (board.owner == request.user or request.user in board.members.all()):
+    if not has_board_access(request, board):
         return JsonResponse({'error': 'Sin permisos'}, status=403)
     
-    data = {
-        'board': {
-            'name': board.name,
-            'description': board.description,
-            'created_at': board.created_at.isoformat(),
-        },
-        'lists': []
-    }
+    include_comments = request.GET.get('comments') in ('1', 'true')
+    variant = 'json-comments' if include_comments else 'json'
+    etag, last_modified = board_validators(request, board, variant, per_user=False)
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return response
     
-    for task_list in board.lists.all():
-        list_data = {
-            'name': task_list.name,
-            'position': task_list.position,
-            'tasks': []
-        }
-        
-        for task in task_list.tasks.all():
-            list_data['tasks'].append({
-                'title': task.title,
-                'description': task.description,
-                'due_date': task.due_date.isoformat() if task.due_date else None,
-                'priority': task.get_priority_display(),
-                'labels': task.labels_list,
-                'assigned_to': task.assigned_to.get_full_name() if task.assigned_to else None,
-                'completed': task.completed,
-                'created_at': task.created_at.isoformat(),
-            })
-        
-        data['lists'].append(list_data)
-    
-    response = JsonResponse(data, json_dumps_params={'indent': 2})
+    # Written piece by piece as the tasks are read, so memory stays flat
+    # whatever the size of the board
+    response = StreamingHttpResponse(stream_board_json(board, include_comments), content_type='application/json')
     response['Content-Disposition'] = f'attachment; filename="{board.name}.json"'
+    return set_validators(response, etag, last_modified)
+
+
+def parse_updated_since(value):
+    """Parse an ISO date or datetime into an aware datetime, or None if invalid"""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@login_required
+def export_board_ndjson(request, pk):
+    """Export board tasks as gzip-compressed NDJSON, one task per line"""
+    board = get_object_or_404(Board, pk=pk)
+    
+    if not has_board_access(request, board):
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+    
+    updated_since = None
+    if request.GET.get('updated_since'):
+        updated_since = parse_updated_since(request.GET['updated_since'])
+        if updated_since is None:
+            return JsonResponse({'error': 'updated_since debe ser una fecha ISO 8601'}, status=400)
+    
+    variant = f'ndjson-{updated_since.timestamp()}' if updated_since else 'ndjson'
+    etag, last_modified = board_validators(request, board, variant, per_user=False)
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return response
+    
+    response = StreamingHttpResponse(stream_board_ndjson(board, updated_since), content_type='application/gzip')
+    response['Content-Disposition'] = f'attachment; filename="{board.name}.ndjson.gz"'
+    return set_validators(response, etag, last_modified)
+
+
+@login_required
+def export_jobs(request):
+    """List the user's account exports and queue a new one"""
+    if request.method == 'POST':
+        # One export at a time: asking again while one is queued reuses it
+        active = request.user.export_jobs.filter(status__in=[ExportJob.PENDING, ExportJob.RUNNING]).first()
+        if active is None:
+            ExportJob.objects.create(user=request.user, include_comments=bool(request.POST.get('comments')))
+            messages.success(request, 'Exportación en cola. Podrás descargarla cuando termine.')
+        else:
+            messages.info(request, 'Ya tienes una exportación en curso.')
+        return redirect('export_jobs')
+    jobs = KeysetPaginator(request.user.export_jobs.all(), 10).get_page(request.GET.get(CURSOR_VAR))
+    return render(request, 'boards/export_jobs.html', {'jobs': jobs})
+
+
+def export_job_data(job):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'boards_done': job.boards_done,
+        'boards_total': job.boards_total,
+        'size': job.size,
+        'error': job.error,
+        'download_url': reverse('export_job_download', kwargs={'pk': job.pk}) if job.status == ExportJob.DONE else None,
+    }
+
+
+@login_required
+def export_job_status(request, pk):
+    """Progress of an account export, polled by the exports page"""
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user)
+    return JsonResponse(export_job_data(job))
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """Return the inclusive (start, end) of a single byte range, or None.
+
+    None means the header should be ignored and the whole file sent; a range
+    starting past the end of the file raises ValueError (416).
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # Suffix range: the last N bytes
+        if int(end) == 0:
+            raise ValueError('Rango vacío')
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        raise ValueError('Rango fuera del archivo')
+    if end < start:
+        return None
+    return start, end
+
+
+def read_range(path, start, length, block_size=64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+@login_required
+def export_job_download(request, pk):
+    """Serve a finished account export, honouring Range so downloads can resume"""
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user, status=ExportJob.DONE)
+    path = os.path.join(settings.MEDIA_ROOT, job.file)
+    if not os.path.exists(path):
+        raise Http404('El archivo de la exportación ya no existe')
+    size = os.path.getsize(path)
+    # The archive never changes once written, so its job and size identify it
+    etag = f'"export-{job.pk}-{size}"'
+    filename = f'tableros-{job.created_at:%Y%m%d}.zip'
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    # A client resuming a different file than this one gets the whole file
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                                content_type='application/zip')
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(path, start, end - start + 1), status=206,
+                                         content_type='application/zip')
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
     return response
 
 
+FACET_TITLES = [
+    ('status', 'Estado'),
+    ('priority', 'Prioridad'),
+    ('label', 'Etiqueta'),
+    ('assignee', 'Asignada a'),
+    ('list', 'Lista'),
+]
+
+
+def search_facets(request, facets, filters):
+    """Facets for the sidebar, each value with the URL that toggles its filter"""
+    sidebar = []
+    for name, title in FACET_TITLES:
+        entries = facets.get(name, [])
+        for entry in entries:
+            params = request.GET.copy()
+            params.pop(CURSOR_VAR, None)
+            entry['active'] = filters.get(name) == entry['value']
+            if entry['active']:
+                params.pop(name, None)
+            else:
+                params[name] = entry['value']
+            entry['url'] = '?' + params.urlencode()
+        if entries:
+            sidebar.append({'name': name, 'title': title, 'entries': entries})
+    return sidebar
+
+
 @login_required
 def search_tasks(request):
     """Search tasks across all user's boards"""
     query = request.GET.get('q', '')
     
+    capped = False
+    result_count = 0
+    facets = []
+    filters = {}
+    page_params = ''
     if query:
-        # Get all boards user has access to
-        user_boards = Board.objects.filter(
-            Q(owner=request.user) | Q(members=request.user)
-        ).distinct()
-        
-        # Search tasks in those boards
-        tasks = Task.objects.filter(
-            task_list__board__in=user_boards
-        ).filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(labels__icontains=query)
-        ).select_related('task_list__board', 'assigned_to')
+        # Ranked ids and facet counts of every match, cached until one of the
+        # user's boards changes; pages only load their own 20 tasks (see search.py)
+        filters = search_filters(request.GET)
+        result = run_search(request.user, query, filters)
+        capped = result['capped']
+        result_count = len(result['ids'])
+        facets = search_facets(request, result['facets'], filters)
+        params = request.GET.copy()
+        params.pop(CURSOR_VAR, None)
+        page_params = params.urlencode()
         
-        paginator = Paginator(tasks, 20)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        page_obj = paginate_ranked_ids(result['ids'], 20, request.GET.get(CURSOR_VAR))
+        tasks = Task.objects.filter(pk__in=page_obj.object_list).select_related(
+            'task_list__board', 'assigned_to'
+        ).with_labels().in_bulk()
+        page_obj.object_list = [tasks[pk] for pk in page_obj.object_list if pk in tasks]
+        for task in page_obj:
+            task.search_title = highlight(task.title, query)
+            task.search_snippet = highlight(task.description, query)
     else:
         page_obj = None
     
     context = {
         'query': query,
         'page_obj': page_obj,
+        'capped': capped,
+        'result_count': result_count,
+        'facets': facets,
+        'filtered': bool(filters),
+        'page_params': page_params,
     }
     return render(request, 'boards/search_results.html', context)
 
 
+SUGGEST_LIMIT = 10
+
+
+@login_required
+def suggest_tasks(request):
+    """Best matching task titles for a partly typed query (navbar typeahead)"""
+    query = request.GET.get('q', '').strip()
+    results = []
+    if len(query) >= 2:
+        boards = user_boards(request.user)
+        task_ids = get_search_backend().suggest(boards, query, SUGGEST_LIMIT)
+        # Also drops tasks deleted or moved away since the index was built
+        tasks = {task['pk']: task for task in Task.objects.filter(
+            pk__in=task_ids, task_list__board__in=[pk for pk, _ in boards]
+        ).values('pk', 'title', 'task_list__name', 'task_list__board__name')}
+        results = [{
+            'id': task['pk'],
+            'title': task['title'],
+            'board': task['task_list__board__name'],
+            'list': task['task_list__name'],
+            'url': reverse('task_detail', args=[task['pk']]),
+        } for task in (tasks[pk] for pk in task_ids if pk in tasks)]
+    return JsonResponse({'results': results})
+
+
 from django.shortcuts import get_object_or_404, redirect
 from .models import TaskList
 
 @login_required
 def editar_lista(request, lista_id):
-    lista = get_object_or_404(TaskList, id=lista_id)
+    lista = get_object_or_404(TaskList.objects.select_related('board'), id=lista_id)
+    if not has_board_access(request, lista.board):
+        messages.error(request, 'No tienes permiso para modificar este tablero.')
+        return redirect('board_list')
     if request.method == 'POST':
         nuevo_nombre = request.POST.get('nombre')
         if nuevo_nombre:
@@ -4,6 +4,7 @@ $(document).ready(function() {
     initializeDragAndDrop();
     initializeQuickActions();
     initializeKeyboardShortcuts();
+    initializeLazyLoading();
 });
 
 function initializeDragAndDrop() {
@@ -91,11 +92,21 @@ function calculateDropPosition(event, container) {
     return position;
 }
 
+function appendTaskCard(container, taskElement) {
+    // Cards always go before the "load more" marker of a partly loaded list
+    var loadMore = container.children('.load-more-tasks');
+    if (loadMore.length) {
+        taskElement.insertBefore(loadMore);
+    } else {
+        container.append(taskElement);
+    }
+}
+
 function moveTaskInDOM(taskElement, newContainer, position) {
     var tasks = newContainer.find('.task-card');
     
     if (position >= tasks.length) {
-        newContainer.append(taskElement);
+        appendTaskCard(newContainer, taskElement);
     } else {
         taskElement.insertBefore(tasks.eq(position));
     }
@@ -120,7 +131,11 @@ function updateTaskPosition(taskId, newListId, newPosition) {
         },
         data: JSON.stringify({
             'new_list_id': newListId,
-            'new_position': newPosition
+            'new_position': newPosition,
+            // The server places the card between its new neighbours; the
+            // index is only a fallback
+            'previous_task_id': taskElement.prevAll('.task-card').first().data('task-id') || null,
+            'next_task_id': taskElement.nextAll('.task-card').first().data('task-id') || null
         }),
         beforeSend: function(xhr) {
             xhr.setRequestHeader("X-CSRFToken", $('[name=csrfmiddlewaretoken]').val());
@@ -136,7 +151,8 @@ function updateTaskPosition(taskId, newListId, newPosition) {
                 }, 1000);
                 
                 // Update task counts
-                updateTaskCounts();
+                var originalList = $('#' + taskElement.data('original-list')).closest('.task-list');
+                updateTaskCounts(originalList.data('list-id'), newListId);
             } else {
                 handleMoveError(taskElement, response.error);
             }
@@ -159,7 +175,7 @@ function handleMoveError(taskElement, errorMessage) {
     if (originalList.length) {
         var tasks = originalList.find('.task-card');
         if (originalPosition >= tasks.length) {
-            originalList.append(taskElement);
+            appendTaskCard(originalList, taskElement);
         } else {
             taskElement.insertBefore(tasks.eq(originalPosition));
         }
@@ -175,12 +191,19 @@ function handleMoveError(taskElement, errorMessage) {
     }, 1000);
 }
 
-function updateTaskCounts() {
-    $('.task-list').each(function() {
-        var listId = $(this).data('list-id');
-        var taskCount = $(this).find('.task-card').length;
-        $(this).find('.task-count').text(taskCount);
-    });
+function updateTaskCounts(fromListId, toListId) {
+    // Lists may hold more cards than are loaded, so adjust the server-side
+    // counts instead of counting cards in the DOM
+    if (!fromListId || fromListId == toListId) {
+        return;
+    }
+    adjustTaskCount(fromListId, -1);
+    adjustTaskCount(toListId, 1);
+}
+
+function adjustTaskCount(listId, delta) {
+    var badge = $('.task-list[data-list-id="' + listId + '"] .task-count');
+    badge.text(parseInt(badge.text(), 10) + delta);
 }
 
 function initializeQuickActions() {
@@ -287,14 +310,68 @@ function addTaskToDOM(task, listId) {
     `;
     
     var container = $('#tasks-' + listId);
-    container.append(taskHtml);
+    appendTaskCard(container, $(taskHtml));
     
     // Animate the new task
-    var newTask = container.find('.task-card').last();
+    var newTask = container.find('.task-card[data-task-id="' + task.id + '"]');
     newTask.hide().slideDown(300);
     
     // Make it draggable
     newTask.attr('draggable', true);
+    adjustTaskCount(listId, 1);
+}
+
+function initializeLazyLoading() {
+    // Long lists only render their first cards; fetch the rest on scroll
+    $('.tasks-container').on('scroll', function() {
+        var container = this;
+        if (container.scrollTop + container.clientHeight >= container.scrollHeight - 100) {
+            loadMoreTasks($(container).children('.load-more-tasks'));
+        }
+    });
+
+    $(document).on('click', '.load-more-btn', function(e) {
+        e.preventDefault();
+        loadMoreTasks($(this).closest('.load-more-tasks'));
+    });
+}
+
+function loadMoreTasks(loadMore) {
+    if (!loadMore.length || loadMore.data('loading')) {
+        return;
+    }
+    loadMore.data('loading', true);
+    var container = loadMore.closest('.tasks-container');
+
+    $.ajax({
+        url: loadMore.data('url'),
+        method: 'GET',
+        data: {'cursor': loadMore.attr('data-cursor')},
+        success: function(response) {
+            if (!response.success) {
+                showNotification('Error al cargar las tareas', 'danger');
+                return;
+            }
+            $(response.html).filter('.task-card').each(function() {
+                // A card dragged in while the page was in flight is already shown
+                var taskId = $(this).data('task-id');
+                if (!container.find('.task-card[data-task-id="' + taskId + '"]').length) {
+                    appendTaskCard(container, $(this));
+                }
+            });
+            if (response.has_more) {
+                loadMore.attr('data-cursor', response.next_cursor);
+            } else {
+                loadMore.remove();
+            }
+        },
+        error: function() {
+            showNotification('Error de conexión', 'danger');
+        },
+        complete: function() {
+            loadMore.data('loading', false);
+        }
+    });
 }
 
 function initializeKeyboardShortcuts() {
@@ -421,7 +498,7 @@ function initializeTouchSupport() {
             });
             
             // Move in DOM
-            dropTarget.append(draggedElement);
+            appendTaskCard(dropTarget, draggedElement);
             
             // Update backend
             updateTaskPosition(taskId, newListId, dropTarget.find('.task-card').length - 1);
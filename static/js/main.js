@@ -61,6 +61,39 @@ $(document).ready(function() {
         }
     });
 
+    // Navbar typeahead: best matching task titles while typing
+    var suggestInput = $('input[data-suggest-url]');
+    var suggestMenu = $('#search-suggestions');
+    var suggestRequest = null;
+    suggestInput.on('input', debounce(function() {
+        var query = suggestInput.val().trim();
+        if (suggestRequest) {
+            suggestRequest.abort();
+        }
+        if (query.length < 2) {
+            suggestMenu.removeClass('show').empty();
+            return;
+        }
+        suggestRequest = $.getJSON(suggestInput.data('suggest-url'), {q: query}, function(data) {
+            suggestMenu.empty();
+            $.each(data.results, function(i, task) {
+                suggestMenu.append(
+                    $('<a class="dropdown-item text-truncate">').attr('href', task.url).append(
+                        $('<div>').text(task.title),
+                        $('<small class="text-muted">').text(task.board + ' › ' + task.list)
+                    )
+                );
+            });
+            suggestMenu.toggleClass('show', data.results.length > 0);
+        });
+    }, 150));
+    suggestInput.on('blur', function() {
+        // Let a click on a suggestion land before hiding them
+        setTimeout(function() {
+            suggestMenu.removeClass('show');
+        }, 200);
+    });
+
     // Keyboard shortcuts
     $(document).on('keydown', function(e) {
         // Ctrl/Cmd + K for search
@@ -142,6 +142,13 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/home/Agustinw/Task-manager/media/'
 
+# Account exports are built by `manage.py run_exports` on this many processes
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', str(os.cpu_count() or 1)))
+# A running export whose worker sent no heartbeat for EXPORT_LEASE seconds is
+# claimed again, up to EXPORT_MAX_ATTEMPTS runs
+EXPORT_LEASE = int(os.getenv('EXPORT_LEASE', '600'))
+EXPORT_MAX_ATTEMPTS = int(os.getenv('EXPORT_MAX_ATTEMPTS', '3'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -165,6 +172,37 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@trelloclone.com')
 
+# Notifications go through an outbox drained by `manage.py send_notifications`.
+# Failed sends are retried after 1, 2, 4... times NOTIFICATION_RETRY_DELAY seconds.
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '5'))
+NOTIFICATION_RETRY_DELAY = int(os.getenv('NOTIFICATION_RETRY_DELAY', '60'))
+# Users who prefer digests get their assignments in one email once the
+# oldest one has waited this many seconds (see `manage.py flush_digests`)
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv('NOTIFICATION_DIGEST_WINDOW', '300'))
+
+# Cached board snapshots are keyed by Board.version, so this timeout only
+# bounds how long unused entries linger in the cache
+BOARD_SNAPSHOT_CACHE_TIMEOUT = int(os.getenv('BOARD_SNAPSHOT_CACHE_TIMEOUT', '3600'))
+
+# Cards rendered per list on the board page; the rest load on scroll
+BOARD_LIST_PAGE_SIZE = int(os.getenv('BOARD_LIST_PAGE_SIZE', '50'))
+BOARD_LIST_PAGE_SIZE_MAX = 200
+
+# Each user's board memberships are cached for access checks and dropped
+# whenever they change
+BOARD_ACCESS_CACHE_TIMEOUT = int(os.getenv('BOARD_ACCESS_CACHE_TIMEOUT', '3600'))
+
+# Admin changelists paged by cursor count rows only up to this many
+ADMIN_COUNT_LIMIT = int(os.getenv('ADMIN_COUNT_LIMIT', '1000'))
+
+# Search keeps the ranked ids of the first SEARCH_RESULT_LIMIT matches
+# (shown as "1000+"), cached until one of the searcher's boards changes
+SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', '1000'))
+SEARCH_CACHE_TIMEOUT = int(os.getenv('SEARCH_CACHE_TIMEOUT', '300'))
+
+# Without pg_trgm, each worker keeps title trigram indexes of this many boards
+SUGGEST_INDEX_BOARDS = int(os.getenv('SUGGEST_INDEX_BOARDS', '200'))
+
 # Security settings for production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True